@@ -1,10 +1,13 @@
 # config/settings.py
 import os
 
-from dotenv import load_dotenv
+# Load environment variables from .env file if it exists (for local development).
+# Cloud Functions / Cloud Run (K_SERVICE is set) get their settings from the
+# service environment, so skip the .env search there to keep cold starts short.
+if not os.getenv("K_SERVICE"):
+    from dotenv import load_dotenv
 
-# Load environment variables from .env file if it exists (for local development)
-load_dotenv()
+    load_dotenv()
 
 # --- GCP Project Configuration ---
 GCP_PROJECT_ID = os.getenv(
@@ -49,9 +52,6 @@ VERTEX_AI_ANOMALY_ENDPOINT_ID = os.getenv(
 # --- Logging ---
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
-print(f"[DEBUG] GCP_REGION from env = {os.getenv('GCP_REGION')}")
-print(f"[DEBUG] GCP_REGION in code = {GCP_REGION}")
-
 # Define paths relative to the project root (optional, for local development)
 # This is less common for cloud-native apps but useful for managing local data/models
 # PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -1,8 +1,5 @@
 # deployment/cloud_functions/document_trigger.py
-import os
-
 import functions_framework
-from google.cloud import storage
 
 # Assume the main processing logic is in a module that can be imported
 # For a Cloud Function, all your source code (except main.py) needs to be in the same deployment package
@@ -52,50 +49,54 @@ def process_gcs_document(cloud_event):
         None; the function terminates after execution.
     """
     from src.main import (  # This import assumes src is deployed with the function
-        process_new_financial_document,
+        process_new_financial_document_from_gcs_uri,
+        setup_structured_logging,
     )
+    from src.pipeline.dedupe import document_id_from_md5_hash
     from src.utils.logger import get_logger
 
+    # main() sets up logging for the CLI; the function only needs the cheap
+    # structured handler (no Cloud Logging client on the cold start).
+    setup_structured_logging()
     logger = get_logger("cloud_function_logger")  # Re-initialize logger for CF context
 
     data = cloud_event.data
     bucket_name = data["bucket"]
     file_name = data["name"]
-    # mime_type = data["contentType"] # Not directly used by process_new_financial_document, inferred by DocAI
 
     if not file_name.lower().endswith((".pdf", ".jpg", ".jpeg", ".png")):
         logger.info(f"Skipping non-document file: {file_name}")
         return
 
-    # Create a local temporary path for the file (Cloud Functions run in a temp dir)
-    local_temp_file_path = f"/tmp/{file_name}"
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
-    blob = bucket.blob(file_name)
-
-    try:
-        logger.info(
-            f"Downloading {file_name} from gs://{bucket_name} to {local_temp_file_path}"
-        )
-        blob.download_to_filename(local_temp_file_path)
+    # Document AI reads the object straight from GCS, so nothing is downloaded
+    # to /tmp or re-uploaded to the raw bucket. The event carries the object's
+    # MD5, which is all the content-derived document ID needs, so a
+    # re-delivered or re-uploaded file is dropped before any API call.
+    gcs_uri = f"gs://{bucket_name}/{file_name}"
+    document_id = None
+    if data.get("md5Hash"):
+        document_id = document_id_from_md5_hash(data["md5Hash"])
 
-        # Determine document type (simple heuristic for example)
-        document_type = "invoice"
-        if "receipt" in file_name.lower() or "receipt" in file_name.lower():
-            document_type = "receipt"
+    # Determine document type (simple heuristic for example)
+    document_type = "invoice"
+    if "receipt" in file_name.lower():
+        document_type = "receipt"
 
-        logger.info(f"Calling core processing for {file_name} as {document_type}")
-        processed_data = process_new_financial_document(
-            local_temp_file_path, document_type
+    try:
+        logger.info(f"Calling core processing for {gcs_uri} as {document_type}")
+        processed_data = process_new_financial_document_from_gcs_uri(
+            gcs_uri,
+            document_type,
+            mime_type=data.get("contentType"),
+            document_id=document_id,
         )
+        if processed_data["duplicate"]:
+            return
         logger.info(
-            f"Successfully processed document {file_name}. Document ID: {processed_data.get('document_id')}"
+            f"Successfully processed document {file_name}. "
+            f"Document ID: {processed_data.get('document_id')}"
         )
 
     except Exception as e:
         logger.error(f"Error processing document {file_name}: {e}")
         # Consider logging the error to Stackdriver and/or sending to an error reporting service
-    finally:
-        # Clean up the local temporary file
-        if os.path.exists(local_temp_file_path):
-            os.remove(local_temp_file_path)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+"""
+Import-time regression check for the CLI and Cloud Function entry points.
+
+Each module is imported in a fresh interpreter under `python -X importtime`.
+The check fails when a module pulls in an SDK it is meant to load lazily, or
+when its cumulative import time exceeds its budget.
+
+Usage: python scripts/check_import_time.py [--scale 2.0]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_SDKS = [
+    "google.cloud.aiplatform",
+    "vertexai",
+    "google.cloud.bigquery",
+    "google.cloud.logging",
+]
+
+# module -> (budget in ms, modules it must not import)
+CHECKS = {
+    "config.settings": (150, HEAVY_SDKS + ["google.cloud.storage"]),
+    "src.utils.gcp_auth": (
+        200,
+        HEAVY_SDKS + ["google.cloud.storage", "google.cloud.documentai_v1beta3"],
+    ),
+    "src.transaction_ai.categorization": (200, HEAVY_SDKS),
+    "src.document_processing.data_parser": (
+        200,
+        HEAVY_SDKS + ["google.cloud.documentai_v1beta3"],
+    ),
+    "src.main": (1500, HEAVY_SDKS),
+    "deployment.cloud_functions.document_trigger": (
+        1500,
+        HEAVY_SDKS + ["google.cloud.storage"],
+    ),
+}
+
+
+def measure(module):
+    """Return ({imported module: cumulative µs}, stdout) for one cold import."""
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    times = {}
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times, proc.stdout
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="multiply every time budget (for slow CI machines)",
+    )
+    args = parser.parse_args(argv)
+
+    failures = []
+    for module, (budget_ms, forbidden) in CHECKS.items():
+        times, stdout = measure(module)
+        elapsed_ms = times.get(module, 0) / 1000
+        limit_ms = budget_ms * args.scale
+        leaked = [
+            m for m in forbidden if any(n == m or n.startswith(m + ".") for n in times)
+        ]
+        status = "ok"
+        if leaked:
+            failures.append(f"{module} imports {', '.join(leaked)}")
+            status = "FAIL"
+        if elapsed_ms > limit_ms:
+            failures.append(
+                f"{module} took {elapsed_ms:.0f} ms (budget {limit_ms:.0f})"
+            )
+            status = "FAIL"
+        if stdout.strip():
+            failures.append(f"{module} prints on import: {stdout.strip()[:80]!r}")
+            status = "FAIL"
+        print(f"{status:4} {module:44} {elapsed_ms:8.1f} ms  (budget {limit_ms:.0f})")
+
+    if failures:
+        print("\n".join(["", "Import-time check failed:"] + failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
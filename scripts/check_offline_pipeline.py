@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+"""
+Offline end-to-end check of the pipeline against the fakes in src.utils.fakes.
+
+Runs without credentials or network access: Document AI (online, async and
+batch), Cloud Storage, BigQuery and Gemini are all replaced by fakes, and
+local state (cache, indexes) goes to a temporary directory.
+
+Usage: python scripts/check_offline_pipeline.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+PAGES = 2
+ROWS_PER_PAGE = 4
+FIELDS_PER_PAGE = 2
+
+
+def _document(seed: int):
+    """A seller statement: form fields plus a small table on each page."""
+    from google.cloud import documentai_v1 as documentai
+
+    text = []
+
+    def anchor(value):
+        start = sum(len(t) for t in text)
+        text.append(value + "\n")
+        return {
+            "text_segments": [{"start_index": start, "end_index": start + len(value)}]
+        }
+
+    pages = []
+    for page_number in range(1, PAGES + 1):
+        form_fields = [
+            {
+                "field_name": {"text_anchor": anchor(f"{i}. Gross Amount Due")},
+                "field_value": {"text_anchor": anchor(f"$ {seed * 100 + i}.50")},
+            }
+            for i in range(1, FIELDS_PER_PAGE + 1)
+        ]
+        header = {
+            "cells": [
+                {"layout": {"text_anchor": anchor(h)}} for h in ("Item", "Amount")
+            ]
+        }
+        body = [
+            {
+                "cells": [
+                    {"layout": {"text_anchor": anchor(v)}}
+                    for v in (f"Fee {r}", f"{r}.00")
+                ]
+            }
+            for r in range(ROWS_PER_PAGE)
+        ]
+        pages.append(
+            {
+                "page_number": page_number,
+                "form_fields": form_fields,
+                "tables": [{"header_rows": [header], "body_rows": body}],
+            }
+        )
+    return documentai.Document(text="".join(text), pages=pages)
+
+
+def _expected_rows():
+    return PAGES * (FIELDS_PER_PAGE + 2 * ROWS_PER_PAGE)
+
+
+def check_async(workdir, failures):
+    from src.pipeline.pipeline_controller import PipelineController, run_pipeline_async
+    from src.utils.fakes import FakeDocumentAIAsyncClient, LocalStorageClient
+
+    paths = []
+    for i in range(6):
+        path = os.path.join(workdir, "in", f"statement-{i}.pdf")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"%PDF fake " + str(i).encode())
+        paths.append((path, "seller-statement"))
+
+    storage_client = LocalStorageClient(os.path.join(workdir, "gcs"))
+    docai = FakeDocumentAIAsyncClient(
+        document_factory=lambda request: _document(1), latency=0.01
+    )
+
+    async def collect():
+        return [
+            r
+            async for r in run_pipeline_async(
+                paths,
+                max_concurrency=3,
+                use_cache=False,
+                docai_client=docai,
+                storage_client=storage_client,
+                controller=PipelineController(),
+            )
+        ]
+
+    results = asyncio.run(collect())
+    errors = [r.error for r in results if r.error is not None]
+    counts = {len(r.rows) for r in results if r.error is None}
+    if errors or len(results) != len(paths) or counts != {_expected_rows()}:
+        failures.append(f"async: errors={errors} row counts={counts}")
+    if docai.max_in_flight > 3:
+        failures.append(f"async: {docai.max_in_flight} requests in flight (max 3)")
+    archived = storage_client.list_blobs(os.environ["GCS_RAW_DOCUMENTS_BUCKET"])
+    if len(archived) != len(paths):
+        failures.append(f"async: {len(archived)} documents archived, not {len(paths)}")
+    return f"{len(results)} documents, peak {docai.max_in_flight} in flight"
+
+
+def check_batch(workdir, failures):
+    from src.pipeline.pipeline_controller import PipelineController
+    from src.utils.fakes import FakeBatchDocumentAIClient, LocalStorageClient
+
+    storage_client = LocalStorageClient(os.path.join(workdir, "gcs"))
+    # more than ten inputs, so output prefixes ".../1" and ".../10" coexist
+    for i in range(13):
+        storage_client.bucket("batch-in").blob(f"docs/d{i:02}.pdf").upload_from_string(
+            str(i)
+        )
+    docai = FakeBatchDocumentAIClient(
+        storage_client,
+        document_factory=lambda content: _document(int(content)),
+        shards_per_document=2,
+    )
+    results = list(
+        PipelineController().run_batch(
+            "gs://batch-in/docs/",
+            "gs://batch-out/results/",
+            "seller-statement",
+            poll_interval=0,
+            docai_client=docai,
+            storage_client=storage_client,
+        )
+    )
+    wrong = {uri: len(rows) for uri, rows in results if len(rows) != _expected_rows()}
+    if len(results) != 13 or wrong:
+        failures.append(f"batch: {len(results)} results, wrong row counts {wrong}")
+    return f"{len(results)} documents from sharded output"
+
+
+def check_gcs_trigger(workdir, failures):
+    import src.main as main_module
+    from src.pipeline.dedupe import GcsProcessedIndex
+    from src.pipeline.pipeline_controller import PipelineController
+    from src.utils.client_registry import get_client, reset_clients
+    from src.utils.fakes import FakeDocumentAIClient, LocalStorageClient
+
+    storage_client = LocalStorageClient(os.path.join(workdir, "gcs"))
+    controller = PipelineController()
+    controller.docai_client = FakeDocumentAIClient(lambda request: _document(1))
+    controller.storage_client = storage_client
+    get_client("pipeline_controller", lambda: controller)
+    get_client(
+        "processed_index",
+        lambda: GcsProcessedIndex("gs://state/index/", storage_client=storage_client),
+    )
+    try:
+        results = [
+            main_module.process_new_financial_document_from_gcs_uri(
+                "gs://uploads/statement.pdf", "seller-statement", document_id="doc-1"
+            )
+            for _ in range(2)
+        ]
+    finally:
+        reset_clients()
+
+    detail = results[0].get("DetailCSV", "")
+    bucket, _, name = detail[len("gs://") :].partition("/")
+    if not storage_client.bucket(bucket).blob(name).exists():
+        failures.append(f"gcs trigger: no detail CSV at {detail!r}")
+    if [r["duplicate"] for r in results] != [False, True]:
+        failures.append("gcs trigger: redelivery was not skipped via the GCS index")
+    if os.path.exists(main_module.OUTPUT_DIR):
+        failures.append(
+            f"gcs trigger: wrote local files under {main_module.OUTPUT_DIR}"
+        )
+    return "detail CSV in GCS, redelivery skipped, nothing written locally"
+
+
+def check_bigquery(failures):
+    from google.cloud import bigquery
+
+    from src.data_storage.bigquery_handler import BigQueryBatchWriter
+    from src.utils.fakes import FakeBigQueryClient
+
+    client = FakeBigQueryClient()
+    schema = [bigquery.SchemaField("document_id", "STRING")]
+    writer = BigQueryBatchWriter(
+        "transactions", schema=schema, client=client, row_id_field="document_id"
+    )
+    for i in range(5):
+        writer.add({"document_id": f"doc-{i % 3}"})
+    writer.close()
+    stored = sum(len(rows) for rows in client.tables.values())
+    if stored != 3:
+        failures.append(f"bigquery: {stored} rows stored after dedup, not 3")
+
+    # a failed flush keeps its rows; with row ids, bulk flushes still stream
+    client = FakeBigQueryClient(errors=[None, ConnectionError("reset")])
+    writer = BigQueryBatchWriter(
+        "transactions",
+        schema=schema,
+        client=client,
+        max_buffer_rows=1000,
+        load_job_threshold=10,
+        max_request_rows=10,
+        row_id_field="document_id",
+    )
+    writer.add_many({"document_id": f"doc-{i}"} for i in range(25))
+    try:
+        writer.flush()
+        failures.append("bigquery: failed insert did not raise")
+    except ConnectionError:
+        pass
+    writer.close()
+    retried = sum(len(rows) for rows in client.tables.values())
+    if retried != 25 or client.load_calls:
+        failures.append(
+            f"bigquery: {retried} of 25 rows stored after a failed insert, "
+            f"{len(client.load_calls)} load jobs"
+        )
+    return f"{stored} rows stored from 5 inserts (row-id dedup), failed flush retried"
+
+
+def check_categorization(failures):
+    from google.api_core.exceptions import ResourceExhausted
+
+    from src.transaction_ai.categorization import suggest_categories_batch
+    from src.transaction_ai.categorization_engine import CategorizationEngine
+    from src.utils.fakes import FakeGeminiModel
+
+    descriptions = [f"vendor {i}" for i in range(30)]
+    model = FakeGeminiModel(classify=lambda d: "Meals")
+    batched = suggest_categories_batch(descriptions, ["Meals"], model=model)
+    if set(batched) != {"Meals"} or len(model.prompts) != 1:
+        failures.append(f"categorization: {len(model.prompts)} prompts for one batch")
+
+    model = FakeGeminiModel(
+        classify=lambda d: "Meals", errors=[ResourceExhausted("quota")]
+    )
+    engine = CategorizationEngine(
+        model=model, requests_per_minute=0, batch_size=10, base_delay=0.01
+    )
+    categories = engine.categorize(descriptions, ["Meals"])
+    if set(categories) != {"Meals"} or engine.stats.retries != 1:
+        failures.append(
+            f"categorization engine: {set(categories)}, "
+            f"{engine.stats.retries} retries (expected 1)"
+        )
+    return f"{len(model.prompts)} requests incl. 1 retried quota error"
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="offline-check-")
+    # No credentials: any real SDK client created along the way would fail.
+    os.environ.pop("GOOGLE_APPLICATION_CREDENTIALS", None)
+    for name, value in {
+        "GCP_PROJECT_ID": "offline",
+        "GCS_RAW_DOCUMENTS_BUCKET": "raw",
+        "GCS_PROCESSED_DOCUMENTS_BUCKET": "processed",
+        "DOCUMENT_AI_INVOICE_PROCESSOR_ID": "invoice",
+        "DOCUMENT_AI_RECEIPT_PROCESSOR_ID": "receipt",
+        "DOCUMENT_AI_W2_PROCESSOR_ID": "w2",
+        "DOCUMENT_AI_SELLER_STATEMENT_PROCESSOR_ID": "seller-statement",
+    }.items():
+        os.environ.setdefault(name, value)
+    for name, filename in {
+        "DOCAI_CACHE_DIR": "docai-cache",
+        "PROCESSED_INDEX_PATH": "processed.sqlite",
+        "CATALOG_PATH": "catalog.sqlite",
+        "CATEGORY_MEMO_PATH": "categories.sqlite",
+        "OUTPUT_DIR": "output",
+    }.items():
+        os.environ[name] = os.path.join(workdir, filename)
+
+    failures = []
+    checks = [
+        ("async pipeline", lambda: check_async(workdir, failures)),
+        ("batch pipeline", lambda: check_batch(workdir, failures)),
+        ("gcs trigger", lambda: check_gcs_trigger(workdir, failures)),
+        ("bigquery writer", lambda: check_bigquery(failures)),
+        ("categorization", lambda: check_categorization(failures)),
+    ]
+    for name, check in checks:
+        before = len(failures)
+        try:
+            detail = check()
+        except Exception as e:
+            failures.append(f"{name}: {type(e).__name__}: {e}")
+            detail = "raised"
+        status = "ok" if len(failures) == before else "FAIL"
+        print(f"{status:4} {name:20} {detail}")
+
+    if failures:
+        print("\n".join(["", "Offline check failed:"] + failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
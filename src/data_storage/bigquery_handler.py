@@ -1,4 +1,10 @@
 # src/data_storage/bigquery_handler.py
+import datetime
+import io
+import json
+import threading
+import time
+
 from google.cloud import bigquery
 
 from config.settings import (
@@ -27,63 +33,253 @@ def create_dataset_if_not_exists():
             raise
 
 
-def load_data_to_bigquery(data: list, table_id: str, schema: list = None):
+# Streaming inserts are limited to 10 MB per request; keep a safety margin.
+MAX_INSERT_REQUEST_BYTES = 9 * 1024 * 1024
+# BigQuery recommends at most ~500 rows per insertAll request.
+MAX_INSERT_ROWS = 500
+# Flushes at or above this many rows go through a (free) load job instead.
+LOAD_JOB_ROW_THRESHOLD = 10000
+
+# Tables already known to exist, so get_table is called once per process and
+# client (clients are shared process-wide, see src.utils.client_registry).
+_known_tables = set()
+_known_tables_lock = threading.Lock()
+
+
+def _ensure_table(client, table_ref, table_id: str, schema: list = None):
+    """Checks that the table exists (creating it when a schema is given)."""
+    key = (id(client), str(table_ref))
+    if key in _known_tables:
+        return
+    with _known_tables_lock:
+        if key in _known_tables:
+            return
+        try:
+            client.get_table(table_ref)  # Check if table exists
+        except Exception as e:
+            if "Not found" in str(e) and schema:
+                table = bigquery.Table(table_ref, schema=schema)
+                client.create_table(table)
+                logger.info(f"Table {table_id} created with provided schema.")
+            else:
+                logger.error(f"Error getting table {table_id}: {e}")
+                raise
+        _known_tables.add(key)
+
+
+def _prepare_row(row: dict) -> dict:
+    """Transform a row for BigQuery, especially BIGNUMERIC which requires string
+    and ensuring dates are in 'YYYY-MM-DD' format if not already."""
+    processed_row = row.copy()
+    if "amount" in processed_row and processed_row["amount"] is not None:
+        processed_row["amount"] = str(
+            processed_row["amount"]
+        )  # BIGNUMERIC expects string
+    if (
+        "transaction_date" in processed_row
+        and processed_row["transaction_date"] is not None
+    ):
+        # Ensure date is a string in 'YYYY-MM-DD' format
+        if isinstance(processed_row["transaction_date"], datetime.date):
+            processed_row["transaction_date"] = processed_row[
+                "transaction_date"
+            ].isoformat()
+        elif not isinstance(processed_row["transaction_date"], str):
+            logger.warning(
+                f"Unexpected date type for transaction_date: {type(processed_row['transaction_date'])}"
+            )
+            processed_row["transaction_date"] = None  # Or attempt conversion
+    return processed_row
+
+
+class BigQueryBatchWriter:
+    """
+    Buffers rows for one table and writes them in bulk.
+
+    Rows are flushed when `max_buffer_rows` are pending or `flush_interval`
+    seconds have passed since the first buffered row, and on flush()/close().
+    The interval is only checked on add (there is no timer), so a writer
+    that goes idle keeps its rows until the caller flushes or closes it.
+
+    Small flushes use streaming inserts split into requests under
+    MAX_INSERT_REQUEST_BYTES / MAX_INSERT_ROWS; flushes of at least
+    `load_job_threshold` rows are sent as one NDJSON load job, which is free
+    and much faster for bulk data. With `row_id_field` set, each row's value
+    of that field is sent as its insertId so BigQuery drops retried
+    duplicates; load jobs have no insertIds, so such a writer always
+    streams. If a flush fails, the rows not yet sent go back to the front of
+    the buffer before the error is raised, so a later flush retries them.
+    Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        table_id: str,
+        schema: list = None,
+        client=None,
+        max_buffer_rows: int = LOAD_JOB_ROW_THRESHOLD,
+        flush_interval: float = 5.0,
+        load_job_threshold: int = LOAD_JOB_ROW_THRESHOLD,
+        max_request_bytes: int = MAX_INSERT_REQUEST_BYTES,
+        max_request_rows: int = MAX_INSERT_ROWS,
+        row_id_field: str = None,
+    ):
+        self.table_id = table_id
+        self.schema = schema
+        self.client = client or get_bigquery_client()
+        self.table_ref = self.client.dataset(BQ_DATASET_ID).table(table_id)
+        self.max_buffer_rows = max_buffer_rows
+        self.flush_interval = flush_interval
+        self.load_job_threshold = load_job_threshold
+        self.max_request_bytes = max_request_bytes
+        self.max_request_rows = max_request_rows
+        self.row_id_field = row_id_field
+
+        self.rows_streamed = 0
+        self.rows_loaded = 0
+        self.insert_requests = 0
+        self.load_jobs = 0
+
+        self._buffer = []
+        self._first_buffered_at = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, row: dict):
+        self.add_many([row])
+
+    def add_many(self, rows):
+        rows = iter(rows)
+        with self._lock:
+            for row in rows:
+                if not self._buffer:
+                    self._first_buffered_at = time.monotonic()
+                self._buffer.append(_prepare_row(row))
+                if len(self._buffer) >= self.max_buffer_rows:
+                    try:
+                        self._flush_locked()
+                    except Exception:
+                        # keep the caller's remaining rows with the unsent ones
+                        self._buffer.extend(_prepare_row(r) for r in rows)
+                        raise
+            if (
+                self._buffer
+                and time.monotonic() - self._first_buffered_at >= self.flush_interval
+            ):
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        self.flush()
+
+    def _flush_locked(self):
+        rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+        first_buffered_at = self._first_buffered_at
+        sent = 0
+        try:
+            _ensure_table(self.client, self.table_ref, self.table_id, self.schema)
+            if len(rows) >= self.load_job_threshold and not self.row_id_field:
+                self._load(rows)
+                sent = len(rows)
+            else:
+                for count in self._stream(rows):
+                    sent += count
+        except Exception:
+            self._buffer = rows[sent:] + self._buffer
+            self._first_buffered_at = first_buffered_at
+            logger.error(
+                f"{len(rows) - sent} rows for BigQuery table {self.table_id} "
+                f"were not written and remain buffered."
+            )
+            raise
+
+    def _stream(self, rows: list):
+        """Insert rows in request-sized chunks, yielding each chunk's size."""
+        chunk, chunk_bytes = [], 0
+        for row in rows:
+            size = len(json.dumps(row, default=str)) + 1
+            if chunk and (
+                chunk_bytes + size > self.max_request_bytes
+                or len(chunk) >= self.max_request_rows
+            ):
+                self._insert(chunk)
+                yield len(chunk)
+                chunk, chunk_bytes = [], 0
+            chunk.append(row)
+            chunk_bytes += size
+        if chunk:
+            self._insert(chunk)
+            yield len(chunk)
+        logger.info(f"{len(rows)} rows streamed to BigQuery table {self.table_id}.")
+
+    def _insert(self, chunk: list):
+        row_ids = None
+        if self.row_id_field:
+            row_ids = [row.get(self.row_id_field) for row in chunk]
+        errors = self.client.insert_rows_json(self.table_ref, chunk, row_ids=row_ids)
+        self.insert_requests += 1
+        if errors:
+            logger.error(
+                f"Errors occurred during BigQuery insert for table "
+                f"{self.table_id}: {errors}"
+            )
+            raise ValueError(f"BigQuery insert errors: {errors}")
+        self.rows_streamed += len(chunk)
+
+    def _load(self, rows: list):
+        payload = "\n".join(json.dumps(row, default=str) for row in rows)
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        )
+        if self.schema:
+            job_config.schema = self.schema
+        job = self.client.load_table_from_file(
+            io.BytesIO(payload.encode("utf-8")), self.table_ref, job_config=job_config
+        )
+        job.result()  # raises on failure
+        self.load_jobs += 1
+        self.rows_loaded += len(rows)
+        logger.info(
+            f"{len(rows)} rows loaded to BigQuery table {self.table_id} (load job)."
+        )
+
+
+def load_data_to_bigquery(
+    data: list,
+    table_id: str,
+    schema: list = None,
+    client=None,
+    row_id_field: str = None,
+):
     """Loads a list of dictionaries into a BigQuery table.
     If the table does not exist and a schema is provided, it will create the table.
+    Large lists are sent as a load job, smaller ones as chunked streaming inserts.
+    Pass row_id_field (e.g. TRANSACTIONS_ROW_ID_FIELD) to deduplicate retries;
+    rows are then always streamed, since load jobs cannot deduplicate.
     """
     if not data:
         logger.warning(f"No data to load to BigQuery table {table_id}.")
         return
 
-    client = get_bigquery_client()
-    table_ref = client.dataset(BQ_DATASET_ID).table(table_id)
+    with BigQueryBatchWriter(
+        table_id, schema=schema, client=client, row_id_field=row_id_field
+    ) as writer:
+        writer.add_many(data)
 
-    try:
-        client.get_table(table_ref)  # Check if table exists
-    except Exception as e:
-        if "Not found" in str(e) and schema:
-            table = bigquery.Table(table_ref, schema=schema)
-            client.create_table(table)
-            logger.info(f"Table {table_id} created with provided schema.")
-        else:
-            logger.error(f"Error getting table {table_id}: {e}")
-            raise
-
-    # Transform data for BigQuery, especially BIGNUMERIC which requires string
-    # and ensuring dates are in 'YYYY-MM-DD' format if not already
-    rows_to_insert = []
-    for row in data:
-        processed_row = row.copy()
-        if "amount" in processed_row and processed_row["amount"] is not None:
-            processed_row["amount"] = str(
-                processed_row["amount"]
-            )  # BIGNUMERIC expects string
-        if (
-            "transaction_date" in processed_row
-            and processed_row["transaction_date"] is not None
-        ):
-            # Ensure date is a string in 'YYYY-MM-DD' format
-            if isinstance(processed_row["transaction_date"], datetime.date):
-                processed_row["transaction_date"] = processed_row[
-                    "transaction_date"
-                ].isoformat()
-            elif not isinstance(processed_row["transaction_date"], str):
-                logger.warning(
-                    f"Unexpected date type for transaction_date: {type(processed_row['transaction_date'])}"
-                )
-                processed_row["transaction_date"] = None  # Or attempt conversion
-
-        rows_to_insert.append(processed_row)
-
-    errors = client.insert_rows_json(table_ref, rows_to_insert)
-    if errors:
-        logger.error(
-            f"Errors occurred during BigQuery insert for table {table_id}: {errors}"
-        )
-        raise ValueError(f"BigQuery insert errors: {errors}")
-    else:
-        logger.info(f"{len(rows_to_insert)} rows loaded to BigQuery table {table_id}.")
 
+# One row per document, keyed by its content-derived document_id.
+TRANSACTIONS_ROW_ID_FIELD = "document_id"
 
 # --- Refined Schema for TRANSACTIONS_TABLE ---
 # This schema aligns with the parsed data from Document AI
@@ -92,7 +288,7 @@ TRANSACTIONS_SCHEMA = [
         "document_id",
         "STRING",
         mode="REQUIRED",
-        description="Unique ID generated for the processed document.",
+        description="Content-derived ID of the processed document.",
     ),
     bigquery.SchemaField(
         "original_file_path",
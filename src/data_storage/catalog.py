@@ -0,0 +1,427 @@
+# src/data_storage/catalog.py
+"""
+Local SQLite catalog of processed documents and their extracted fields, for
+quick lookups without opening the per-document outputs or querying BigQuery.
+
+Usage: python -m src.data_storage.catalog query [--doc-type T] [--like F=TEXT]
+           [--where F=VALUE] [--min F=N] [--max F=N] [--since DATE] [--until DATE]
+       python -m src.data_storage.catalog stats
+"""
+
+import argparse
+import csv
+import datetime
+import math
+import os
+import sys
+import uuid
+
+from src.utils.client_registry import get_client
+from src.utils.local_state import SQLiteStore, default_state_path
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_CATALOG_PATH = os.path.join("data", "output", "catalog.sqlite")
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y")
+# Field rows inserted per transaction while a document's rows stream past.
+CATALOG_BATCH_ROWS = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    document_id TEXT PRIMARY KEY,
+    document_name TEXT NOT NULL,
+    doc_type TEXT NOT NULL,
+    source TEXT,
+    detail_path TEXT,
+    processed_at TEXT NOT NULL,
+    row_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fields (
+    document_id TEXT NOT NULL REFERENCES documents(document_id),
+    field TEXT NOT NULL,
+    value TEXT,
+    value_num REAL,
+    value_date TEXT,
+    page INTEGER,
+    line_number TEXT,
+    value_text TEXT
+);
+CREATE INDEX IF NOT EXISTS documents_doc_type ON documents(doc_type, processed_at);
+CREATE INDEX IF NOT EXISTS documents_processed_at ON documents(processed_at);
+CREATE INDEX IF NOT EXISTS fields_document ON fields(document_id, field);
+CREATE INDEX IF NOT EXISTS fields_num ON fields(field, value_num);
+CREATE INDEX IF NOT EXISTS fields_date ON fields(field, value_date);
+"""
+# Raw text of a field; catalogs created before it was kept have no column.
+_ADD_VALUE_TEXT = "ALTER TABLE fields ADD COLUMN value_text TEXT"
+
+
+def to_number(value):
+    """Numeric form of an extracted value, or None."""
+    if not value:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def to_date(value):
+    """ISO date of an extracted value in a known date format, or None."""
+    if not value:
+        return None
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+
+def document_key(document_id, source, document_name):
+    """The catalog's key for a document: its ID, else one derived from its source."""
+    return document_id or str(uuid.uuid5(uuid.NAMESPACE_URL, source or document_name))
+
+
+class CatalogRecorder:
+    """
+    Pass-through over a stream of extraction rows that records each row
+    (including its raw text) in the catalog in batches of `batch_size` as
+    it streams past, so the catalog is filled in the same pass that writes
+    the detail output without holding the document's rows in memory.
+    Call finish() once the stream is consumed, or discard() if writing it
+    failed.
+    """
+
+    def __init__(
+        self,
+        rows,
+        catalog,
+        document_id,
+        document_name,
+        doc_type,
+        source=None,
+        batch_size=CATALOG_BATCH_ROWS,
+    ):
+        self._rows = rows
+        self._catalog = catalog
+        self.document_id = document_key(document_id, source, document_name)
+        self.document_name = document_name
+        self.doc_type = doc_type
+        self.source = source
+        self.batch_size = batch_size
+        self.row_count = 0
+
+    def __iter__(self):
+        self._catalog.remove_document(self.document_id)
+        batch = []
+        for r in self._rows:
+            text = getattr(r, "text", None)
+            batch.append((r.field, r.value, r.page, r.line_number, text))
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+            yield r
+        self._flush(batch)
+
+    def _flush(self, batch):
+        if batch:
+            self._catalog.add_fields(self.document_id, batch)
+            self.row_count += len(batch)
+
+    def finish(self, detail_path=None):
+        self._catalog.finish_document(
+            self.document_id,
+            self.document_name,
+            self.doc_type,
+            self.row_count,
+            source=self.source,
+            detail_path=detail_path,
+        )
+
+    def discard(self):
+        self._catalog.remove_document(self.document_id)
+
+
+class Catalog(SQLiteStore):
+    """
+    documents(document_id, document_name, doc_type, source, detail_path,
+    processed_at, row_count) plus one fields row per extracted value, with
+    value_num / value_date holding the value's numeric or ISO date form and
+    value_text the raw text it was cleaned from (clean_value() keeps only
+    numeric characters, so names such as vendors are only found there).
+    Indexed on doc_type, processed_at, (field, value_num) and
+    (field, value_date). Safe to share between threads.
+    """
+
+    SCHEMA = _SCHEMA
+    WAL = True  # the query CLI reads while a run is writing
+
+    def __init__(self, path: str = DEFAULT_CATALOG_PATH):
+        super().__init__(path)
+        with self._conn:
+            columns = {c[1] for c in self._conn.execute("PRAGMA table_info(fields)")}
+            if "value_text" not in columns:
+                self._conn.execute(_ADD_VALUE_TEXT)
+
+    @classmethod
+    def from_env(cls) -> "Catalog":
+        return cls(default_state_path("CATALOG_PATH", DEFAULT_CATALOG_PATH))
+
+    def add_document(
+        self,
+        document_id,
+        document_name,
+        doc_type,
+        rows,
+        source=None,
+        detail_path=None,
+    ):
+        """
+        Record one document and its (field, value, page, line_number, text)
+        rows, replacing any earlier entry for the same document_id. Without a
+        document_id one is derived from the source.
+        """
+        document_id = document_key(document_id, source, document_name)
+        rows = list(rows)
+        self.remove_document(document_id)
+        self.add_fields(document_id, rows)
+        self.finish_document(
+            document_id,
+            document_name,
+            doc_type,
+            len(rows),
+            source=source,
+            detail_path=detail_path,
+        )
+
+    def remove_document(self, document_id):
+        """Drop a document and its fields."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM fields WHERE document_id = ?", (document_id,)
+            )
+            self._conn.execute(
+                "DELETE FROM documents WHERE document_id = ?", (document_id,)
+            )
+
+    def add_fields(self, document_id, rows):
+        """Insert a batch of (field, value, page, line_number, text) rows."""
+        field_rows = [
+            (
+                document_id,
+                field,
+                value,
+                to_number(value),
+                to_date(value) or to_date(text),
+                page,
+                ln,
+                text,
+            )
+            for field, value, page, ln, text in rows
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO fields (document_id, field, value, value_num, "
+                "value_date, page, line_number, value_text) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                field_rows,
+            )
+
+    def finish_document(
+        self,
+        document_id,
+        document_name,
+        doc_type,
+        row_count,
+        source=None,
+        detail_path=None,
+    ):
+        """
+        Write the documents row once its fields are in; until then the
+        document is not returned by queries, which start from documents.
+        """
+        processed_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    document_id,
+                    document_name,
+                    doc_type,
+                    source,
+                    detail_path,
+                    processed_at,
+                    row_count,
+                ),
+            )
+        return document_id
+
+    def find_documents(
+        self,
+        doc_type=None,
+        equals=(),
+        like=(),
+        minimum=(),
+        maximum=(),
+        since=None,
+        until=None,
+        date_field=None,
+        limit=None,
+    ):
+        """
+        Documents matching every condition, newest first, as dicts.
+        equals/like/minimum/maximum are (field, value) pairs: exact cleaned
+        value or raw text, case-insensitive substring of the raw text,
+        value_num >= / <= value. since/until
+        (ISO dates, inclusive) apply to processed_at, or to the date value of
+        `date_field` when given.
+        """
+        clauses, params = [], []
+        if doc_type:
+            clauses.append("d.doc_type = ?")
+            params.append(doc_type)
+
+        def field_clause(condition, field, *values):
+            clauses.append(
+                "d.document_id IN (SELECT document_id FROM fields "
+                f"WHERE field = ? AND {condition})"
+            )
+            params.extend([field, *values])
+
+        for field, value in equals:
+            field_clause("(value = ? OR value_text = ?)", field, value, value)
+        for field, value in like:
+            field_clause("COALESCE(value_text, value) LIKE ?", field, f"%{value}%")
+        for field, value in minimum:
+            field_clause("value_num >= ?", field, float(value))
+        for field, value in maximum:
+            field_clause("value_num <= ?", field, float(value))
+        if date_field:
+            if since:
+                field_clause("value_date >= ?", date_field, since)
+            if until:
+                field_clause("value_date <= ?", date_field, until)
+        else:
+            if since:
+                clauses.append("d.processed_at >= ?")
+                params.append(since)
+            if until:
+                # processed_at is a full timestamp; include the whole day
+                clauses.append("d.processed_at < date(?, '+1 day')")
+                params.append(until)
+
+        sql = "SELECT d.* FROM documents d"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY d.processed_at DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def document_fields(self, document_id, fields=None):
+        """
+        {field: value} of one document (first value per field), falling back
+        to the raw text where the cleaned value is empty.
+        """
+        sql = (
+            "SELECT field, COALESCE(NULLIF(value, ''), value_text) FROM fields "
+            "WHERE document_id = ?"
+        )
+        params = [document_id]
+        if fields:
+            sql += f" AND field IN ({', '.join('?' * len(fields))})"
+            params.extend(fields)
+        values = {}
+        with self._lock:
+            for field, value in self._conn.execute(sql, params):
+                values.setdefault(field, value)
+        return values
+
+    def stats(self):
+        """[(doc_type, documents, rows)] over the whole catalog."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT doc_type, COUNT(*), SUM(row_count) FROM documents "
+                "GROUP BY doc_type ORDER BY doc_type"
+            ).fetchall()
+
+
+def get_catalog() -> Catalog:
+    """Return the process-wide Catalog, opening it on first use."""
+    return get_client("catalog", Catalog.from_env)
+
+
+def _pairs(values, parser, option):
+    pairs = []
+    for item in values or []:
+        field, sep, value = item.partition("=")
+        if not sep or not field:
+            parser.error(f"{option} expects FIELD=VALUE, got {item!r}")
+        pairs.append((field, value))
+    return pairs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m src.data_storage.catalog",
+        description="Query the local catalog of processed documents.",
+    )
+    parser.add_argument("--catalog", help="catalog path (default: CATALOG_PATH)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    query = sub.add_parser("query", help="list matching documents as CSV")
+    query.add_argument("--doc-type")
+    query.add_argument("--where", action="append", help="FIELD=VALUE exact match")
+    query.add_argument("--like", action="append", help="FIELD=TEXT substring")
+    query.add_argument("--min", action="append", help="FIELD=NUMBER lower bound")
+    query.add_argument("--max", action="append", help="FIELD=NUMBER upper bound")
+    query.add_argument("--since", help="YYYY-MM-DD, inclusive")
+    query.add_argument("--until", help="YYYY-MM-DD, inclusive")
+    query.add_argument(
+        "--date-field",
+        help="apply --since/--until to this field instead of the processing date",
+    )
+    query.add_argument(
+        "--show", action="append", default=[], help="add this field as a column"
+    )
+    query.add_argument("--limit", type=int)
+    sub.add_parser("stats", help="documents and rows per doc_type")
+    args = parser.parse_args(argv)
+
+    catalog = Catalog(args.catalog) if args.catalog else Catalog.from_env()
+    out = csv.writer(sys.stdout)
+    if args.command == "stats":
+        out.writerow(["doc_type", "documents", "rows"])
+        out.writerows(catalog.stats())
+        return 0
+
+    docs = catalog.find_documents(
+        doc_type=args.doc_type,
+        equals=_pairs(args.where, parser, "--where"),
+        like=_pairs(args.like, parser, "--like"),
+        minimum=_pairs(args.min, parser, "--min"),
+        maximum=_pairs(args.max, parser, "--max"),
+        since=args.since,
+        until=args.until,
+        date_field=args.date_field,
+        limit=args.limit,
+    )
+    columns = ["document_name", "doc_type", "processed_at", "detail_path"]
+    out.writerow(columns + args.show)
+    for doc in docs:
+        shown = (
+            catalog.document_fields(doc["document_id"], args.show) if args.show else {}
+        )
+        out.writerow([doc[c] for c in columns] + [shown.get(f, "") for f in args.show])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
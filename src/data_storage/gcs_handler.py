@@ -1,14 +1,24 @@
 # src/data_storage/gcs_handler.py
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 from src.utils.gcp_auth import get_storage_client
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Concurrent transfers used by upload_many/download_many.
+DEFAULT_TRANSFER_WORKERS = int(os.getenv("GCS_TRANSFER_WORKERS", "8"))
+# Resumable-transfer and streaming chunk size; GCS requires a multiple of 256 KiB.
+DEFAULT_CHUNK_SIZE = int(os.getenv("GCS_CHUNK_SIZE", str(8 * 1024 * 1024)))
 
-def upload_blob(source_file_path, destination_blob_name, bucket_name):
+# The helpers below take an optional storage `client`: the shared one from
+# get_storage_client() by default, or e.g. src.utils.fakes.LocalStorageClient.
+
+
+def upload_blob(source_file_path, destination_blob_name, bucket_name, client=None):
     """Uploads a file to the bucket."""
-    storage_client = get_storage_client()
+    storage_client = client or get_storage_client()
     bucket = storage_client.bucket(bucket_name)
     blob = bucket.blob(destination_blob_name)
 
@@ -18,23 +28,122 @@ def upload_blob(source_file_path, destination_blob_name, bucket_name):
     return public_url
 
 
-def download_blob(source_blob_name, destination_file_path, bucket_name):
+def download_blob(source_blob_name, destination_file_path, bucket_name, client=None):
     """Downloads a blob from the bucket."""
-    storage_client = get_storage_client()
+    storage_client = client or get_storage_client()
     bucket = storage_client.bucket(bucket_name)
     blob = bucket.blob(source_blob_name)
     blob.download_to_filename(destination_file_path)
     logger.info(f"Blob {source_blob_name} downloaded to {destination_file_path}.")
 
 
-def get_blob_as_bytes(blob_name, bucket_name):
+def get_blob_as_bytes(blob_name, bucket_name, client=None):
     """Reads a blob's content as bytes."""
-    storage_client = get_storage_client()
+    storage_client = client or get_storage_client()
     bucket = storage_client.bucket(bucket_name)
     blob = bucket.blob(blob_name)
     return blob.download_as_bytes()
 
 
+def iter_blob_chunks(
+    blob_name, bucket_name, chunk_size=DEFAULT_CHUNK_SIZE, client=None
+):
+    """Yields a blob's content in chunks instead of reading it all into memory."""
+    storage_client = client or get_storage_client()
+    blob = storage_client.bucket(bucket_name).blob(blob_name)
+    with blob.open("rb", chunk_size=chunk_size) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _run_transfers(items, transfer, max_workers):
+    """Runs transfer(item) concurrently; returns (done, [(item, exception)])."""
+    done, failed = [], []
+    with ThreadPoolExecutor(
+        max_workers=max(1, max_workers), thread_name_prefix="gcs-transfer"
+    ) as pool:
+        futures = [pool.submit(transfer, item) for item in items]
+        for item, future in zip(items, futures):
+            try:
+                future.result()
+            except Exception as e:
+                failed.append((item, e))
+            else:
+                done.append(item)
+    return done, failed
+
+
+def upload_many(
+    file_blob_names,
+    bucket_name,
+    max_workers=DEFAULT_TRANSFER_WORKERS,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    skip_if_exists=False,
+    client=None,
+):
+    """
+    Uploads (source_file_path, destination_blob_name) pairs concurrently.
+    With skip_if_exists, blobs that already exist are left untouched (and
+    reported as failed with PreconditionFailed).
+    Returns (uploaded gs:// URIs, [(pair, exception), ...] for failures).
+    """
+    storage_client = client or get_storage_client()
+    bucket = storage_client.bucket(bucket_name)
+    pairs = list(file_blob_names)
+    upload_kwargs = {"if_generation_match": 0} if skip_if_exists else {}
+
+    def upload(pair):
+        path, name = pair
+        blob = bucket.blob(name, chunk_size=chunk_size)
+        blob.upload_from_filename(path, **upload_kwargs)
+
+    from google.api_core.exceptions import PreconditionFailed
+
+    done, failed = _run_transfers(pairs, upload, max_workers)
+    for (path, name), e in failed:
+        if skip_if_exists and isinstance(e, PreconditionFailed):
+            logger.info(f"Skipped {path}: gs://{bucket_name}/{name} already exists")
+        else:
+            logger.error(f"Upload of {path} to gs://{bucket_name}/{name} failed: {e}")
+    logger.info(f"{len(done)} of {len(pairs)} files uploaded to gs://{bucket_name}.")
+    return [get_blob_uri(bucket_name, name) for _, name in done], failed
+
+
+def download_many(
+    blob_file_names,
+    bucket_name,
+    max_workers=DEFAULT_TRANSFER_WORKERS,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    client=None,
+):
+    """
+    Downloads (source_blob_name, destination_file_path) pairs concurrently,
+    creating destination directories as needed.
+    Returns (downloaded file paths, [(pair, exception), ...] for failures).
+    """
+    storage_client = client or get_storage_client()
+    bucket = storage_client.bucket(bucket_name)
+    pairs = list(blob_file_names)
+    for _, path in pairs:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def download(pair):
+        name, path = pair
+        bucket.blob(name, chunk_size=chunk_size).download_to_filename(path)
+
+    done, failed = _run_transfers(pairs, download, max_workers)
+    for (name, path), e in failed:
+        logger.error(f"Download of gs://{bucket_name}/{name} to {path} failed: {e}")
+    logger.info(
+        f"{len(done)} of {len(pairs)} blobs downloaded from gs://{bucket_name}."
+    )
+    return [path for _, path in done], failed
+
+
 def get_blob_uri(bucket_name, blob_name):
     """Constructs the GCS URI for a blob."""
     return f"gs://{bucket_name}/{blob_name}"
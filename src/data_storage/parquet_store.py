@@ -0,0 +1,246 @@
+# src/data_storage/parquet_store.py
+"""
+Partitioned Parquet dataset of extraction rows, an alternative to one detail
+CSV per document.
+
+Layout: <root_dir>/doc_type=<doc_type>/date=<YYYY-MM-DD>/part-<run>.parquet.
+The dataset can be scanned as a whole with pyarrow.dataset (or BigQuery,
+DuckDB, pandas) using hive partitioning. pyarrow is imported lazily, so it is
+only needed when this backend is used.
+
+Usage: python -m src.data_storage.parquet_store export-csv [--doc-type T]
+           [--date YYYY-MM-DD] [--document NAME] [--out DIR]
+"""
+
+import argparse
+import csv
+import datetime
+import os
+import sys
+import threading
+import uuid
+
+from src.utils.local_state import output_dir as _output_root
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Under the same output root as the detail CSVs (OUTPUT_DIR, see main.py).
+DEFAULT_DATASET_DIR = os.path.join(_output_root(), "parquet")
+# Rows buffered per partition before they are written out as one row group.
+DEFAULT_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "50000"))
+DETAIL_FIELDS = ["field", "value", "page", "line_number"]
+COLUMNS = ["document_name", "processed_at"] + DETAIL_FIELDS
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError(
+            "The Parquet output store needs pyarrow: pip install pyarrow"
+        ) from e
+    return pyarrow
+
+
+def _schema(pa):
+    return pa.schema(
+        [
+            ("document_name", pa.string()),
+            ("processed_at", pa.timestamp("us", tz="UTC")),
+            ("field", pa.string()),
+            ("value", pa.string()),
+            ("page", pa.int32()),
+            ("line_number", pa.string()),
+        ]
+    )
+
+
+class ParquetRowStore:
+    """
+    Appends extraction rows to the partitioned Parquet dataset.
+
+    Each (doc_type, date) partition gets one file per store, kept open and
+    written one row group of `row_group_size` rows at a time, so a run over
+    thousands of documents produces a handful of files instead of one per
+    document. Files are written under a hidden name and renamed into place on
+    close(), so readers never see a half-written file. Safe to share between
+    threads.
+    """
+
+    def __init__(
+        self, root_dir: str = DEFAULT_DATASET_DIR, row_group_size=DEFAULT_ROW_GROUP_SIZE
+    ):
+        self.pa = _pyarrow()
+        self.schema = _schema(self.pa)
+        self.root_dir = root_dir
+        self.row_group_size = max(1, row_group_size)
+        self.run_id = (
+            datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S")
+            + "-"
+            + uuid.uuid4().hex[:8]
+        )
+        self._lock = threading.Lock()
+        self._buffers = {}  # partition dir -> {column: [values]}
+        self._writers = {}  # partition dir -> (ParquetWriter, tmp path, path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _partition(self, doc_type: str, processed_at) -> str:
+        return os.path.join(
+            self.root_dir,
+            f"doc_type={doc_type}",
+            f"date={processed_at.date().isoformat()}",
+        )
+
+    def write_rows(self, rows, document_name: str, doc_type: str) -> str:
+        """
+        Add one document's rows (ExtractedRow-like objects). Nothing is added
+        if iterating `rows` fails. Returns the partition file the rows go to.
+        """
+        processed_at = datetime.datetime.now(datetime.timezone.utc)
+        columns = {name: [] for name in DETAIL_FIELDS}
+        for r in rows:
+            columns["field"].append(r.field)
+            columns["value"].append(r.value)
+            columns["page"].append(r.page)
+            columns["line_number"].append(r.line_number)
+        count = len(columns["field"])
+
+        partition = self._partition(doc_type, processed_at)
+        with self._lock:
+            buffer = self._buffers.setdefault(partition, {name: [] for name in COLUMNS})
+            buffer["document_name"].extend([document_name] * count)
+            buffer["processed_at"].extend([processed_at] * count)
+            for name in DETAIL_FIELDS:
+                buffer[name].extend(columns[name])
+            if len(buffer["field"]) >= self.row_group_size:
+                self._flush_partition(partition)
+        return os.path.join(partition, self._filename())
+
+    def flush(self):
+        with self._lock:
+            for partition in list(self._buffers):
+                self._flush_partition(partition)
+
+    def close(self):
+        with self._lock:
+            for partition in list(self._buffers):
+                self._flush_partition(partition)
+            for writer, tmp_path, path in self._writers.values():
+                writer.close()
+                os.replace(tmp_path, path)
+                logger.info(f"Parquet file written: {path}")
+            self._writers = {}
+
+    def _filename(self) -> str:
+        return f"part-{self.run_id}.parquet"
+
+    def _flush_partition(self, partition: str):
+        buffer = self._buffers.pop(partition)
+        if not buffer["field"]:
+            return
+        table = self.pa.Table.from_pydict(buffer, schema=self.schema)
+        if partition not in self._writers:
+            os.makedirs(partition, exist_ok=True)
+            path = os.path.join(partition, self._filename())
+            # dot-prefixed files are ignored by pyarrow.dataset readers
+            tmp_path = os.path.join(partition, f".{self._filename()}.inprogress")
+            writer = self.pa.parquet.ParquetWriter(tmp_path, self.schema)
+            self._writers[partition] = (writer, tmp_path, path)
+        writer = self._writers[partition][0]
+        writer.write_table(table, row_group_size=table.num_rows)
+
+
+def read_rows(root_dir=DEFAULT_DATASET_DIR, doc_type=None, date=None, document=None):
+    """
+    Open the dataset filtered on partitions (and optionally one document).
+    Returns a pyarrow.dataset.Scanner whose batches carry doc_type and date.
+    """
+    pa = _pyarrow()
+    partitioning = pa.dataset.partitioning(
+        pa.schema([("doc_type", pa.string()), ("date", pa.string())]), flavor="hive"
+    )
+    ds = pa.dataset.dataset(root_dir, format="parquet", partitioning=partitioning)
+    expr = None
+    filters = (("doc_type", doc_type), ("date", date), ("document_name", document))
+    for column, value in filters:
+        if value is None:
+            continue
+        cond = pa.dataset.field(column) == value
+        expr = cond if expr is None else expr & cond
+    return ds.scanner(filter=expr)
+
+
+def export_csv(
+    root_dir=DEFAULT_DATASET_DIR,
+    output_dir=None,
+    doc_type=None,
+    date=None,
+    document=None,
+):
+    """
+    Write the dataset back out as per-document detail CSVs in the layout
+    write_detail_csv uses: <output_dir>/<doc_type>/details/<name>_<doc_type>.csv.
+    output_dir defaults to the pipeline's output root. Returns the list of
+    files written.
+    """
+    output_dir = output_dir or _output_root()
+    written = {}
+    scanner = read_rows(root_dir, doc_type=doc_type, date=date, document=document)
+    for batch in scanner.to_batches():
+        data = batch.to_pydict()
+        grouped = {}
+        for i, name in enumerate(data["document_name"]):
+            key = (str(data["doc_type"][i]), name)
+            grouped.setdefault(key, []).append({f: data[f][i] for f in DETAIL_FIELDS})
+        for (dt, name), rows in grouped.items():
+            path = written.get((dt, name))
+            if path is None:
+                detail_dir = os.path.join(output_dir, dt, "details")
+                os.makedirs(detail_dir, exist_ok=True)
+                path = os.path.join(detail_dir, f"{name}_{dt}.csv")
+                with open(path, "w", newline="", encoding="utf-8") as f:
+                    csv.DictWriter(f, fieldnames=DETAIL_FIELDS).writeheader()
+                written[(dt, name)] = path
+            with open(path, "a", newline="", encoding="utf-8") as f:
+                csv.DictWriter(f, fieldnames=DETAIL_FIELDS).writerows(rows)
+    logger.info(f"Exported {len(written)} detail CSV(s) to {output_dir}")
+    return list(written.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m src.data_storage.parquet_store",
+        description="Tools for the Parquet extraction-row dataset.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export-csv", help="write per-document detail CSVs")
+    export.add_argument("--root", default=DEFAULT_DATASET_DIR, help="dataset dir")
+    export.add_argument("--out", default=os.path.join(_output_root(), "export"))
+    export.add_argument("--doc-type", help="only this doc_type partition")
+    export.add_argument("--date", help="only this date partition (YYYY-MM-DD)")
+    export.add_argument("--document", help="only this document name")
+    args = parser.parse_args(argv)
+
+    if args.command == "export-csv":
+        files = export_csv(
+            args.root,
+            args.out,
+            doc_type=args.doc_type,
+            date=args.date,
+            document=args.document,
+        )
+        for path in files:
+            print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,81 +1,128 @@
 # src/document_processing/data_parser.py
 import datetime
+import re
 import uuid
-
-from google.cloud.documentai_v1beta3 import Document
+from typing import TYPE_CHECKING
 
 from src.utils.logger import get_logger
 
+if TYPE_CHECKING:  # only needed for annotations; the SDK is slow to import
+    from google.cloud.documentai_v1beta3 import Document
+
 logger = get_logger(__name__)
 
 
-def _get_entity_value(
-    document: Document, entity_type: str, default_value=None, return_type=str
-):
-    """Helper to extract value from a Document AI entity by type."""
-    for entity in document.entities:
-        if entity.type == entity_type:
-            value_text = entity.mention_text
-            if entity_type in ["total_amount", "net_amount", "tax_amount", "amount"]:
-                try:
-                    # Document AI often gives currency symbol or spaces, clean for float
-                    value_text = (
-                        value_text.replace("$", "")
-                        .replace("€", "")
-                        .replace(",", "")
-                        .strip()
-                    )
-                    return return_type(value_text)
-                except ValueError:
-                    logger.warning(
-                        f"Could not convert {entity_type} '{value_text}' to {return_type}."
-                    )
-                    return default_value
-            if entity_type == "date":
-                # Prioritize normalized_value if available and parseable as date
-                if entity.normalized_value and entity.normalized_value.date:
-                    try:
-                        return datetime.date.fromisoformat(entity.normalized_value.date)
-                    except ValueError:
-                        pass  # Fallback to mention_text
-                # Try to parse mention_text as a date
-                try:
-                    return datetime.datetime.strptime(
-                        value_text, "%Y-%m-%d"
-                    ).date()  # Common format
-                except ValueError:
-                    try:
-                        return datetime.datetime.strptime(
-                            value_text, "%m/%d/%Y"
-                        ).date()  # Another common format
-                    except ValueError:
-                        pass  # Keep trying or fallback
+AMOUNT_ENTITY_TYPES = ("total_amount", "net_amount", "tax_amount", "amount")
+# In priority order: a "$" anywhere wins over "€", which wins over "£".
+CURRENCY_SYMBOLS = {"$": "USD", "€": "EUR", "£": "GBP"}
+_CURRENCY_RE = re.compile("[$€£]")
+_MISSING = object()
+
+
+def detect_currency(text: str):
+    """Single scan of `text` for a currency symbol (see CURRENCY_SYMBOLS)."""
+    seen = set()
+    for m in _CURRENCY_RE.finditer(text or ""):
+        symbol = m.group()
+        if symbol == "$":
+            return CURRENCY_SYMBOLS[symbol]  # highest priority, stop early
+        seen.add(symbol)
+    for symbol, code in CURRENCY_SYMBOLS.items():
+        if symbol in seen:
+            return code
+    return None
+
+
+class EntityIndex:
+    """
+    type -> entities index over a Document, built in one pass over
+    document.entities. Converted values (amounts, dates) are computed once per
+    (type, return_type) and reused, so asking for more fields does not rescan
+    the entities.
+    """
+
+    def __init__(self, document: "Document"):
+        self._by_type = {}
+        for entity in document.entities:
+            self._by_type.setdefault(entity.type, []).append(entity)
+        self._values = {}
+
+    def get(self, entity_type: str, default_value=None, return_type=str):
+        """Value of the first entity of this type, or default_value."""
+        key = (entity_type, return_type)
+        value = self._values.get(key, _MISSING)
+        if value is _MISSING:
+            entities = self._by_type.get(entity_type)
+            value = (
+                _convert_entity(entities[0], entity_type, return_type)
+                if entities
+                else None
+            )
+            self._values[key] = value
+        return default_value if value is None else value
+
+
+def _convert_entity(entity, entity_type: str, return_type):
+    """Extract the value of a Document AI entity; None if it cannot be parsed."""
+    value_text = entity.mention_text
+    if entity_type in AMOUNT_ENTITY_TYPES:
+        try:
+            # Document AI often gives currency symbol or spaces, clean for float
+            value_text = (
+                value_text.replace("$", "").replace("€", "").replace(",", "").strip()
+            )
             return return_type(value_text)
-    return default_value
+        except ValueError:
+            logger.warning(
+                f"Could not convert {entity_type} '{value_text}' to {return_type}."
+            )
+            return None
+    if entity_type == "date":
+        # Prioritize normalized_value if available and parseable as date
+        normalized = entity.normalized_value
+        if normalized.date_value.year:
+            d = normalized.date_value
+            try:
+                return datetime.date(d.year, d.month, d.day)
+            except ValueError:
+                pass  # Fallback to normalized text / mention_text
+        for candidate, fmt in (
+            (normalized.text, "%Y-%m-%d"),
+            (value_text, "%Y-%m-%d"),  # Common format
+            (value_text, "%m/%d/%Y"),  # Another common format
+        ):
+            if not candidate:
+                continue
+            try:
+                return datetime.datetime.strptime(candidate, fmt).date()
+            except ValueError:
+                pass  # Keep trying or fallback
+        return None
+    return return_type(value_text)
 
 
 def parse_document_ai_output(
-    document: Document, original_gcs_uri: str, doc_type: str
+    document: "Document", original_gcs_uri: str, doc_type: str, document_id: str = None
 ) -> dict:
     """
     Parses the Document AI Document object into a structured dictionary for BigQuery.
     This now extracts more specific fields.
+    document_id should be the file's content_document_id(); without it an ID
+    derived from original_gcs_uri is used, so re-parsing stays idempotent.
     """
+    entities = EntityIndex(document)
     data = {
-        "document_id": str(uuid.uuid4()),
+        "document_id": document_id
+        or str(uuid.uuid5(uuid.NAMESPACE_URL, original_gcs_uri)),
         "original_file_path": original_gcs_uri,
         "document_type": doc_type.lower(),
-        "vendor_name": _get_entity_value(document, "vendor_name"),
-        "total_amount": _get_entity_value(document, "total_amount", return_type=float),
-        "currency": _get_entity_value(
-            document, "currency"
-        ),  # Often attached to total_amount entity
-        "transaction_date": _get_entity_value(
-            document, "date", return_type=datetime.date
-        ),
-        "invoice_id": _get_entity_value(document, "invoice_id"),
-        "description": _get_entity_value(document, "description")
-        or _get_entity_value(document, "vendor_name")
+        "vendor_name": entities.get("vendor_name"),
+        "total_amount": entities.get("total_amount", return_type=float),
+        "currency": entities.get("currency"),  # Often attached to total_amount
+        "transaction_date": entities.get("date", return_type=datetime.date),
+        "invoice_id": entities.get("invoice_id"),
+        "description": entities.get("description")
+        or entities.get("vendor_name")
         or "General Transaction",
         "categorization_ai_suggested": None,
         "categorization_user_confirmed": None,
@@ -84,18 +131,9 @@ def parse_document_ai_output(
         "timestamp_processed": datetime.datetime.now(datetime.timezone.utc).isoformat(),
     }
 
-    # If currency wasn't extracted with total_amount, try to find it elsewhere
-    if not data["currency"]:
-        # Look for a top-level currency entity if available
-        data["currency"] = _get_entity_value(document, "currency")
-        # Fallback to common symbols on the page text
-        if not data["currency"] and data["total_amount"] is not None:
-            if "$" in document.text:
-                data["currency"] = "USD"
-            elif "€" in document.text:
-                data["currency"] = "EUR"
-            elif "£" in document.text:
-                data["currency"] = "GBP"
+    # No currency entity: fall back to common symbols on the page text
+    if not data["currency"] and data["total_amount"] is not None:
+        data["currency"] = detect_currency(document.text)
 
     # Post-process description if still generic
     if data["description"] == "General Transaction":
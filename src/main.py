@@ -1,29 +1,74 @@
 # File: src/main.py
+import argparse
+import contextlib
 import csv
+import fnmatch
 import logging
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
-import google.cloud.logging
-from google.cloud.logging.handlers import StructuredLogHandler
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
 
-from src.pipeline.pipeline_controller import run_pipeline
+from src.data_storage.catalog import CatalogRecorder, get_catalog
+from src.pipeline.dedupe import content_document_id, get_processed_index
+from src.pipeline.pipeline_controller import get_pipeline_controller
+from src.utils.local_state import output_dir
 
-# 1) Basic console/file logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
-)
 logger = logging.getLogger()  # grab the root logger
+_logging_configured = False
+_structured_logging_configured = False
+_logging_lock = threading.Lock()
 
-# 2) Cloud logging setup (sync)
-client = google.cloud.logging.Client()
-handler = StructuredLogHandler()  # or StructuredLogHandler(client=client)
-logger.addHandler(handler)
+
+def setup_structured_logging():
+    """
+    Attach Cloud Logging's StructuredLogHandler (JSON lines on stdout, which
+    Cloud Functions / Cloud Run ingest as structured entries) to the root
+    logger. Creates no API client, so the Cloud Function calls it on every
+    invocation; repeated calls do nothing.
+    """
+    global _structured_logging_configured
+    with _logging_lock:
+        if _structured_logging_configured:
+            return
+        from google.cloud.logging.handlers import StructuredLogHandler
+
+        logger.addHandler(StructuredLogHandler())
+        logger.setLevel(logging.INFO)
+        _structured_logging_configured = True
+
+
+def setup_logging():
+    """
+    Configure console logging plus structured Cloud Logging output.
+    Called from main() rather than at import so importing this module (e.g.
+    from the Cloud Function) does not create a Cloud Logging client; the
+    Cloud Function calls setup_structured_logging() instead.
+    """
+    global _logging_configured
+    if _logging_configured:
+        return
+    import google.cloud.logging
+
+    # 1) Basic console/file logging
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+
+    # 2) Cloud logging setup (sync)
+    google.cloud.logging.Client()
+    setup_structured_logging()
+    _logging_configured = True
 
 
 # Output directories and filenames
-OUTPUT_DIR = os.path.join("data", "output")
+OUTPUT_DIR = output_dir()
 DETAILS_SUBDIR = "details"
 CSV_FILENAMES = {
     "invoice": "Invoice-List.csv",
@@ -32,6 +77,20 @@ CSV_FILENAMES = {
     "seller-statement": "Seller-Statement.csv",
 }
 
+# Filename patterns used to infer the doc_type in --dir mode (first match wins)
+DOC_TYPE_PATTERNS = [
+    (("[Ii]nvoice*",), "invoice"),
+    (("*[Rr]eceipt*",), "receipt"),
+    (("[Ww]2*",), "w2"),
+    (("seller-statement*", "sellers-statement*"), "seller-statement"),
+]
+DEFAULT_WORKERS = 4
+# Detail-row backends: one CSV per document, or a partitioned Parquet dataset
+OUTPUT_FORMATS = ("csv", "parquet")
+DEFAULT_OUTPUT_FORMAT = "csv"
+# Summary rows buffered per list file before they are appended in one write
+SUMMARY_BATCH_SIZE = 50
+
 # Summary fields per document type
 SUMMARY_FIELDS = {
     "invoice": ["invoice_number", "total_amount"],
@@ -41,89 +100,605 @@ SUMMARY_FIELDS = {
 }
 
 
+class SummaryCollector:
+    """
+    Pass-through over a stream of extraction rows that counts them and keeps
+    the first value seen for each of the doc_type's SUMMARY_FIELDS, so the
+    detail and summary outputs need only one pass over the rows.
+    """
+
+    def __init__(self, rows, doc_type):
+        self._rows = rows
+        self.fields = SUMMARY_FIELDS.get(doc_type, [])
+        self.values = {}
+        self.count = 0
+
+    def __iter__(self):
+        wanted = set(self.fields)
+        for r in self._rows:
+            self.count += 1
+            if wanted and r.field in wanted:
+                self.values[r.field] = r.value
+                wanted.discard(r.field)
+            yield r
+
+
+def _detail_filename(document_name, doc_type):
+    ts = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    return f"{ts}_{document_name}_{doc_type}.csv"
+
+
+def _write_detail_rows(f, rows):
+    writer = csv.DictWriter(f, fieldnames=["field", "value", "page", "line_number"])
+    writer.writeheader()
+    for r in rows:
+        writer.writerow(
+            {
+                "field": r.field,
+                "value": r.value,
+                "page": r.page,
+                "line_number": r.line_number,
+            }
+        )
+
+
 def write_detail_csv(rows, document_name, doc_type):
     """
-    Write detailed extraction rows to a per-document CSV under data/output/<doc_type>/details/ with timestamp.
-    Returns the filepath.
+    Write detailed extraction rows to a per-document CSV under
+    OUTPUT_DIR/<doc_type>/details/ with timestamp.
+    `rows` may be any iterable (e.g. PipelineController.iter_rows); each row is
+    written as soon as it is produced. Returns the filepath.
     """
     detail_dir = os.path.join(OUTPUT_DIR, doc_type, DETAILS_SUBDIR)
     os.makedirs(detail_dir, exist_ok=True)
-    ts = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-    filename = f"{ts}_{document_name}_{doc_type}.csv"
-    path = os.path.join(detail_dir, filename)
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=["field", "value", "page", "line_number"])
-        writer.writeheader()
-        for r in rows:
-            writer.writerow(
-                {
-                    "field": r.get("field", ""),
-                    "value": r.get("value", ""),
-                    "page": r.get("page", 0),
-                    "line_number": r.get("line_number", ""),
-                }
-            )
+    path = os.path.join(detail_dir, _detail_filename(document_name, doc_type))
+    try:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            _write_detail_rows(f, rows)
+    except BaseException:
+        # don't leave a truncated detail file behind if extraction fails midway
+        if os.path.exists(path):
+            os.remove(path)
+        raise
     return path
 
 
-def write_summary_csv(detail_path, document_name, doc_type, rows):
+def write_detail_csv_gcs(rows, document_name, doc_type, storage_client=None):
     """
-    Append a summary row for this document into the per-type CSV list file.
-    Columns: filename, insert_timestamp, <summary fields...>, detail_link
+    Stream detailed extraction rows to a per-document CSV in the processed
+    documents bucket, at <doc_type>/details/ like write_detail_csv(), without
+    touching the local filesystem. Returns the object's gs:// URI.
     """
-    summary_file = os.path.join(OUTPUT_DIR, CSV_FILENAMES[doc_type])
-    os.makedirs(os.path.dirname(summary_file), exist_ok=True)
-    write_header = not os.path.exists(summary_file)
-    ts = datetime.utcnow().isoformat()
+    from config.settings import GCS_PROCESSED_DOCUMENTS_BUCKET
 
-    # Build summary data
-    summary = {
-        "filename": document_name,
-        "insert_timestamp": ts,
-    }
-    for key in SUMMARY_FIELDS.get(doc_type, []):
-        val = ""
-        for r in rows:
-            if r.get("field") == key:
-                val = r.get("value", "")
-                break
-        summary[key] = val
-    # clickable file link
-    abs_path = os.path.abspath(detail_path)
-    summary["detail_link"] = f"file://{abs_path}"
-
-    with open(summary_file, "a", newline="", encoding="utf-8") as f:
+    storage_client = storage_client or get_pipeline_controller().storage_client
+    bucket_name = GCS_PROCESSED_DOCUMENTS_BUCKET.removeprefix("gs://").strip("/")
+    blob_name = "/".join(
+        [doc_type, DETAILS_SUBDIR, _detail_filename(document_name, doc_type)]
+    )
+    blob = storage_client.bucket(bucket_name).blob(blob_name)
+    try:
+        with blob.open("w", newline="", encoding="utf-8") as f:
+            _write_detail_rows(f, rows)
+    except BaseException:
+        # closing the writer uploaded what was written; drop the partial object
+        with contextlib.suppress(Exception):
+            blob.delete()
+        raise
+    return f"gs://{bucket_name}/{blob_name}"
+
+
+class SummaryListWriter:
+    """
+    Single writer for the per-type summary list CSVs (Invoice-List.csv, ...).
+
+    Appends from any thread are serialised through one lock and buffered per
+    file, then flushed in batches of `batch_size` rows (and on flush/close).
+    Each flush holds an exclusive file lock while it checks for an empty file
+    and writes the header, so concurrent writers never duplicate it.
+    """
+
+    def __init__(self, output_dir=OUTPUT_DIR, batch_size=SUMMARY_BATCH_SIZE):
+        self.output_dir = output_dir
+        self.batch_size = max(1, batch_size)
+        self._lock = threading.Lock()
+        self._pending = {}  # summary_file -> (fieldnames, [rows])
+
+    def append(self, detail_path, document_name, doc_type, values):
+        """
+        Queue a summary row for this document; returns the list file path.
+        `values` maps summary field -> extracted value (see SummaryCollector).
+        """
+        summary_file = os.path.join(self.output_dir, CSV_FILENAMES[doc_type])
         fieldnames = (
             ["filename", "insert_timestamp"]
             + SUMMARY_FIELDS.get(doc_type, [])
             + ["detail_link"]
         )
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        if write_header:
-            writer.writeheader()
-        writer.writerow(summary)
 
-    return summary_file
+        # Build summary data
+        summary = {
+            "filename": document_name,
+            "insert_timestamp": datetime.utcnow().isoformat(),
+        }
+        for key in SUMMARY_FIELDS.get(doc_type, []):
+            summary[key] = values.get(key, "")
+        # clickable file link
+        abs_path = os.path.abspath(detail_path)
+        summary["detail_link"] = f"file://{abs_path}"
 
+        with self._lock:
+            _, pending = self._pending.setdefault(summary_file, (fieldnames, []))
+            pending.append(summary)
+            if len(pending) >= self.batch_size:
+                self._flush_file(summary_file)
+        return summary_file
+
+    def flush(self):
+        with self._lock:
+            for summary_file in list(self._pending):
+                self._flush_file(summary_file)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _flush_file(self, summary_file):
+        fieldnames, pending = self._pending.pop(summary_file)
+        if not pending:
+            return
+        os.makedirs(os.path.dirname(summary_file), exist_ok=True)
+        with open(summary_file, "a", newline="", encoding="utf-8") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0, os.SEEK_END)
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                if f.tell() == 0:
+                    writer.writeheader()
+                writer.writerows(pending)
+                f.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def write_summary_csv(detail_path, document_name, doc_type, values, writer=None):
+    """
+    Append a summary row for this document into the per-type CSV list file.
+    Columns: filename, insert_timestamp, <summary fields...>, detail_link
+    Without a shared `writer` the row is written immediately.
+    """
+    if writer is not None:
+        return writer.append(detail_path, document_name, doc_type, values)
+    with SummaryListWriter(batch_size=1) as w:
+        return w.append(detail_path, document_name, doc_type, values)
+
+
+def infer_doc_type(filename):
+    """
+    Infer the doc_type from a filename, mirroring the `case` block of parse_all.sh.
+    Returns None for files that do not match any known pattern.
+    """
+    for patterns, doc_type in DOC_TYPE_PATTERNS:
+        if any(fnmatch.fnmatchcase(filename, p) for p in patterns):
+            return doc_type
+    return None
+
+
+def write_detail_outputs(rows, local_path, doc_type, store=None):
+    """
+    Stream one document's rows into its detail CSV, or into the Parquet
+    dataset when a ParquetRowStore is given as `store`.
+    Returns (detail_path, collector) where collector holds the row count and
+    the captured summary values.
+    """
+    document_name = os.path.splitext(os.path.basename(local_path))[0]
+    collector = SummaryCollector(rows, doc_type)
+    if store is not None:
+        detail_path = store.write_rows(collector, document_name, doc_type)
+    else:
+        detail_path = write_detail_csv(collector, document_name, doc_type)
+    logger.info(f"Parsed {collector.count} rows for {document_name} ({doc_type})")
+    logger.info(f"Detail rows written: {detail_path}")
+    return detail_path, collector
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: python -m src.main <local-pdf-path> <doc-type>")
-        sys.exit(1)
 
-    local_path = sys.argv[1]
-    doc_type = sys.argv[2].lower().strip()
+def write_summary_outputs(local_path, doc_type, detail_path, collector, writer=None):
+    """
+    Append the document to its summary list (through `writer` if given).
+    Returns a summary-table row describing the outputs.
+    """
     document_name = os.path.splitext(os.path.basename(local_path))[0]
+    summary_path = write_summary_csv(
+        detail_path, document_name, doc_type, collector.values, writer=writer
+    )
+    logger.info(f"Summary CSV updated: {summary_path}")
+
+    return {
+        "Timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "Filename": os.path.basename(local_path),
+        "InputDir": os.path.dirname(local_path),
+        "DocType": doc_type,
+        "SummaryCSV": summary_path,
+        "DetailCSV": detail_path,
+    }
 
+
+def write_outputs(
+    rows, local_path, doc_type, writer=None, store=None, document_id=None
+):
+    """
+    Write the detail and summary outputs for one document in a single pass
+    over its rows, recording them in the local catalog in batches as they pass.
+    Returns a summary-table row describing the outputs.
+    """
+    recorder = CatalogRecorder(
+        rows,
+        get_catalog(),
+        document_id,
+        os.path.splitext(os.path.basename(local_path))[0],
+        doc_type,
+        source=local_path,
+    )
     try:
-        rows = run_pipeline(local_path, doc_type)
-        logger.info(f"Parsed {len(rows)} rows for {document_name} ({doc_type})")
+        detail_path, collector = write_detail_outputs(
+            recorder, local_path, doc_type, store=store
+        )
+        result = write_summary_outputs(
+            local_path, doc_type, detail_path, collector, writer=writer
+        )
+    except BaseException:
+        recorder.discard()
+        raise
+    recorder.finish(detail_path)
+    return result
+
+
+def open_row_store(output_format):
+    """
+    Context manager for the detail-row backend: a ParquetRowStore for
+    "parquet", or None (one detail CSV per document) for "csv".
+    """
+    if output_format == "parquet":
+        from src.data_storage.parquet_store import ParquetRowStore
+
+        return ParquetRowStore()
+    return contextlib.nullcontext()
+
+
+def print_summary_table(results):
+    """Pretty-print the per-document results as an ASCII table."""
+    if not results:
+        print("No documents parsed.")
+        return
+
+    cols = ["Timestamp", "Filename", "InputDir", "DocType", "SummaryCSV", "DetailCSV"]
+    widths = [max([len(c)] + [len(str(r[c])) for r in results]) for c in cols]
+    sep = "+" + "+".join("-" * (w + 2) for w in widths) + "+"
+
+    print(sep)
+    print("|" + "|".join(f" {c:<{w}} " for c, w in zip(cols, widths)) + "|")
+    print(sep)
+    for r in results:
+        print("|" + "|".join(f" {str(r[c]):<{w}} " for c, w in zip(cols, widths)) + "|")
+    print(sep)
+
+
+def mark_processed(marks):
+    """
+    Record (document_id, source, doc_type) entries in the processed index.
+    Called once the documents' outputs have been flushed, so a run killed
+    midway leaves nothing marked whose outputs did not land.
+    """
+    index = get_processed_index()
+    for document_id, source, doc_type in marks:
+        index.mark(document_id, source, doc_type)
+
+
+def process_new_financial_document(
+    local_path,
+    doc_type,
+    use_cache=True,
+    force=False,
+    writer=None,
+    store=None,
+    content=None,
+    marks=None,
+):
+    """
+    Process one document unless its content was already processed.
+    `content` is the file's bytes if already read (the file is read once).
+    Returns a dict with the content-derived "document_id", "duplicate" (True
+    when skipped) and, for processed documents, the summary-table row.
+
+    With a shared `writer` or `store`, rows may still be buffered on return:
+    pass a `marks` list, which receives the document's processed-index entry,
+    and call mark_processed(marks) after closing them. Otherwise the document
+    is marked processed before returning.
+    """
+    if content is None:
+        with open(local_path, "rb") as f:
+            content = f.read()
+    document_id = content_document_id(content)
+    if not force and document_id in get_processed_index():
+        logger.info(f"Skipping {local_path}: already processed as {document_id}")
+        return {"document_id": document_id, "duplicate": True}
+
+    rows = get_pipeline_controller().iter_rows(
+        local_path, doc_type, use_cache=use_cache, content=content
+    )
+    result = write_outputs(
+        rows, local_path, doc_type, writer=writer, store=store, document_id=document_id
+    )
+    entry = (document_id, local_path, doc_type)
+    if marks is None:
+        mark_processed([entry])
+    else:
+        marks.append(entry)
+    return {"document_id": document_id, "duplicate": False, **result}
+
 
-        detail_path = write_detail_csv(rows, document_name, doc_type)
-        logger.info(f"Detail CSV written: {detail_path}")
+def process_new_financial_document_from_gcs_uri(
+    gcs_uri,
+    doc_type,
+    mime_type=None,
+    document_id=None,
+    force=False,
+    marks=None,
+):
+    """
+    Process a document already stored in GCS without downloading it: Document
+    AI reads it from gcs_uri. document_id is the content ID derived from the
+    object's md5Hash (see src.pipeline.dedupe); when given, documents already
+    processed are skipped. Returns the same dict, and takes `marks` the same
+    way, as process_new_financial_document().
+
+    This is the Cloud Function path, so nothing is written locally: the
+    detail CSV goes straight to the processed documents bucket, and the
+    local summary lists and catalog are not updated.
+    """
+    if document_id and not force and document_id in get_processed_index():
+        logger.info(f"Skipping {gcs_uri}: already processed as {document_id}")
+        return {"document_id": document_id, "duplicate": True}
+
+    controller = get_pipeline_controller()
+    rows = controller.iter_rows_gcs(gcs_uri, doc_type, mime_type=mime_type)
+    document_name = os.path.splitext(os.path.basename(gcs_uri))[0]
+    collector = SummaryCollector(rows, doc_type)
+    detail_uri = write_detail_csv_gcs(
+        collector, document_name, doc_type, storage_client=controller.storage_client
+    )
+    logger.info(f"Parsed {collector.count} rows for {document_name} ({doc_type})")
+    logger.info(f"Detail rows written: {detail_uri}")
+    result = {
+        "Timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "Filename": os.path.basename(gcs_uri),
+        "InputDir": os.path.dirname(gcs_uri),
+        "DocType": doc_type,
+        "SummaryCSV": "",
+        "DetailCSV": detail_uri,
+    }
+    if document_id:
+        entry = (document_id, gcs_uri, doc_type)
+        if marks is None:
+            mark_processed([entry])
+        else:
+            marks.append(entry)
+    return {"document_id": document_id, "duplicate": False, **result}
+
+
+def process_directory(
+    input_dir,
+    workers=DEFAULT_WORKERS,
+    use_cache=True,
+    force=False,
+    output_format=DEFAULT_OUTPUT_FORMAT,
+):
+    """
+    Process every recognised document in input_dir with the shared
+    PipelineController and a bounded pool of worker threads.
+    Workers stream rows into each document's detail CSV and append to the
+    summary lists through one shared SummaryListWriter. Each file is read
+    once, by its worker; files whose content was already processed (or
+    repeats another file in this run) are skipped unless force is set.
+    Documents are marked processed only after the writer and row store
+    are closed.
+    Returns (results, failures).
+    """
+    jobs = []
+    for fname in sorted(os.listdir(input_dir)):
+        path = os.path.join(input_dir, fname)
+        if not os.path.isfile(path) or "." not in fname:
+            continue
+        doc_type = infer_doc_type(fname)
+        if doc_type is None:
+            logger.warning(f"Skipping unknown file type: {fname}")
+            continue
+        jobs.append((path, doc_type))
+
+    done, failures, marks = {}, [], []
+    if not jobs:
+        return [], failures
+
+    seen, seen_lock = set(), threading.Lock()
+    with SummaryListWriter() as writer, open_row_store(output_format) as store:
+
+        def process(path, doc_type):
+            with open(path, "rb") as f:
+                content = f.read()
+            document_id = content_document_id(content)
+            with seen_lock:
+                if document_id in seen:
+                    logger.info(f"Skipping {path}: same content as another file")
+                    return None
+                seen.add(document_id)
+            return process_new_financial_document(
+                path,
+                doc_type,
+                use_cache=use_cache,
+                force=force,
+                writer=writer,
+                store=store,
+                content=content,
+                marks=marks,
+            )
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {
+                pool.submit(process, path, doc_type): path for path, doc_type in jobs
+            }
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    done[path] = future.result()
+                except Exception as e:
+                    logger.error(f"Pipeline failed for {path}: {e}")
+                    failures.append(path)
+    mark_processed(marks)
+
+    duplicates = sum(1 for r in done.values() if r and r["duplicate"])
+    if duplicates:
+        logger.info(f"{duplicates} document(s) already processed; use --force")
+    # keep the table in input order, like the shell loop did
+    results = [
+        done[path] for path, _ in jobs if done.get(path) and not done[path]["duplicate"]
+    ]
+    return results, failures
 
-        summary_path = write_summary_csv(detail_path, document_name, doc_type, rows)
-        logger.info(f"Summary CSV updated: {summary_path}")
+
+def process_gcs_batch(
+    input_prefix, output_prefix, doc_type, output_format=DEFAULT_OUTPUT_FORMAT
+):
+    """
+    Run a Document AI batch job over a GCS prefix and write outputs for
+    each input document as its sharded results are read back.
+    Returns (results, failures).
+    """
+    controller = get_pipeline_controller()
+    results, failures = [], []
+    batch = controller.run_batch(input_prefix, output_prefix, doc_type)
+    with SummaryListWriter() as writer, open_row_store(output_format) as store:
+        for input_uri, rows in batch:
+            try:
+                results.append(
+                    write_outputs(rows, input_uri, doc_type, writer=writer, store=store)
+                )
+            except Exception as e:
+                logger.error(f"Writing outputs failed for {input_uri}: {e}")
+                failures.append(input_uri)
+    return results, failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m src.main",
+        description="Extract financial document data with Document AI.",
+    )
+    parser.add_argument("local_path", nargs="?", help="local PDF to process")
+    parser.add_argument("doc_type", nargs="?", help="invoice|receipt|w2|...")
+    parser.add_argument(
+        "--dir",
+        dest="input_dir",
+        help="process every recognised document in this directory",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"concurrent documents in --dir mode (default {DEFAULT_WORKERS})",
+    )
+    parser.add_argument(
+        "--batch-input",
+        help="gs:// prefix to process with Document AI batch_process_documents",
+    )
+    parser.add_argument(
+        "--batch-output",
+        help="gs:// prefix where the batch job writes its JSON output",
+    )
+    parser.add_argument(
+        "--doc-type",
+        dest="batch_doc_type",
+        help="doc_type of every file in --batch-input",
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="ignore cached Document AI responses and call the API again",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="reprocess documents whose content was already processed",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default=DEFAULT_OUTPUT_FORMAT,
+        help="detail rows as one CSV per document, or appended to a partitioned "
+        "Parquet dataset under data/output/parquet (needs pyarrow)",
+    )
+    args = parser.parse_args(argv)
+    if args.batch_input:
+        if not (args.batch_output and args.batch_doc_type):
+            parser.error("--batch-input requires --batch-output and --doc-type")
+        if args.input_dir or args.local_path:
+            parser.error("--batch-input cannot be combined with other inputs")
+    elif args.input_dir:
+        if args.local_path or args.doc_type:
+            parser.error("--dir cannot be combined with <local-pdf-path> <doc-type>")
+    elif not (args.local_path and args.doc_type):
+        parser.error("either <local-pdf-path> <doc-type> or --dir is required")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    setup_logging()
+
+    if args.batch_input or args.input_dir:
+        if args.batch_input:
+            results, failures = process_gcs_batch(
+                args.batch_input,
+                args.batch_output,
+                args.batch_doc_type.lower().strip(),
+                args.output_format,
+            )
+        else:
+            results, failures = process_directory(
+                args.input_dir,
+                args.workers,
+                args.use_cache,
+                args.force,
+                args.output_format,
+            )
+        print_summary_table(results)
+        if failures:
+            logger.error(f"{len(failures)} document(s) failed")
+            sys.exit(1)
+        return
+
+    local_path = args.local_path
+    doc_type = args.doc_type.lower().strip()
+
+    try:
+        marks = []
+        with open_row_store(args.output_format) as store:
+            process_new_financial_document(
+                local_path,
+                doc_type,
+                use_cache=args.use_cache,
+                force=args.force,
+                store=store,
+                marks=marks,
+            )
+        mark_processed(marks)
     except Exception as e:
         logger.error(f"Pipeline failed: {e}")
         sys.exit(1)
@@ -0,0 +1,141 @@
+# File: src/pipeline/dedupe.py
+import base64
+import datetime
+import hashlib
+import json
+import os
+import uuid
+
+from src.utils.client_registry import get_client
+from src.utils.local_state import SQLiteStore, default_state_path
+
+DEFAULT_INDEX_PATH = os.path.join("data", "cache", "processed.sqlite")
+_READ_CHUNK_BYTES = 1024 * 1024
+
+
+# Document IDs are the MD5 of the file bytes formatted as a UUID. MD5 is what
+# GCS reports as an object's md5Hash, so the ID of an uploaded object is known
+# from its metadata (or the finalize event) without downloading it.
+
+
+def content_document_id(content: bytes) -> str:
+    """Deterministic document ID for a file's bytes."""
+    return str(uuid.UUID(bytes=hashlib.md5(content).digest()))
+
+
+def file_document_id(local_path: str) -> str:
+    """content_document_id() of a local file, read in chunks."""
+    digest = hashlib.md5()
+    with open(local_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return str(uuid.UUID(bytes=digest.digest()))
+
+
+def document_id_from_md5_hash(md5_hash: str) -> str:
+    """content_document_id() from a GCS object's base64 md5Hash."""
+    return str(uuid.UUID(bytes=base64.b64decode(md5_hash)))
+
+
+class ProcessedIndex(SQLiteStore):
+    """
+    SQLite record of the document IDs that have already been processed, so
+    a file submitted again (e.g. an email-ingest retry) is skipped before it
+    is uploaded or sent to Document AI. Safe to share between threads.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS processed (
+        document_id TEXT PRIMARY KEY,
+        source TEXT,
+        doc_type TEXT,
+        processed_at TEXT);
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        super().__init__(path)
+
+    @classmethod
+    def from_env(cls) -> "ProcessedIndex":
+        return cls(default_state_path("PROCESSED_INDEX_PATH", DEFAULT_INDEX_PATH))
+
+    def __contains__(self, document_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM processed WHERE document_id = ?", (document_id,)
+            ).fetchone()
+        return row is not None
+
+    def mark(self, document_id: str, source: str = None, doc_type: str = None):
+        """Record document_id as processed (the latest source wins)."""
+        processed_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?)",
+                (document_id, source, doc_type, processed_at),
+            )
+
+
+class GcsProcessedIndex:
+    """
+    ProcessedIndex kept in GCS as one small marker object per document ID
+    under `uri` (gs://bucket/prefix/), so every Cloud Function / Cloud Run
+    instance sees the same index and it outlives the instance.
+    """
+
+    def __init__(self, uri: str, storage_client=None):
+        self.uri = uri if uri.endswith("/") else uri + "/"
+        self.bucket_name, _, self.prefix = self.uri[len("gs://") :].partition("/")
+        self._storage_client = storage_client
+
+    @classmethod
+    def from_env(cls) -> "GcsProcessedIndex":
+        uri = os.getenv("PROCESSED_INDEX_URI")
+        if not uri:
+            from config.settings import GCS_PROCESSED_DOCUMENTS_BUCKET
+
+            bucket = GCS_PROCESSED_DOCUMENTS_BUCKET.removeprefix("gs://").strip("/")
+            uri = f"gs://{bucket}/processed-index/"
+        return cls(uri)
+
+    @property
+    def storage_client(self):
+        if self._storage_client is None:
+            from src.utils.gcp_auth import get_storage_client
+
+            self._storage_client = get_storage_client()
+        return self._storage_client
+
+    def _blob(self, document_id: str):
+        bucket = self.storage_client.bucket(self.bucket_name)
+        return bucket.blob(f"{self.prefix}{document_id}")
+
+    def __contains__(self, document_id: str) -> bool:
+        return self._blob(document_id).exists()
+
+    def mark(self, document_id: str, source: str = None, doc_type: str = None):
+        """Record document_id as processed (the latest source wins)."""
+        processed_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        marker = {"source": source, "doc_type": doc_type, "processed_at": processed_at}
+        self._blob(document_id).upload_from_string(
+            json.dumps(marker), content_type="application/json"
+        )
+
+    def close(self):
+        pass
+
+
+def processed_index_from_env():
+    """
+    The GcsProcessedIndex when PROCESSED_INDEX_URI is set or on Cloud
+    Functions / Cloud Run (K_SERVICE), where instance-local files are neither
+    shared nor durable; otherwise the local SQLite ProcessedIndex.
+    """
+    if os.getenv("PROCESSED_INDEX_URI") or os.getenv("K_SERVICE"):
+        return GcsProcessedIndex.from_env()
+    return ProcessedIndex.from_env()
+
+
+def get_processed_index():
+    """Return the process-wide processed index, opening it on first use."""
+    return get_client("processed_index", processed_index_from_env)
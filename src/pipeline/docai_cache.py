@@ -0,0 +1,115 @@
+# File: src/pipeline/docai_cache.py
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+from src.utils.local_state import default_state_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join("data", "cache", "docai")
+DEFAULT_MAX_BYTES = 1024**3  # 1 GiB
+# After an eviction the cache is trimmed to this fraction of max_bytes so we do
+# not rescan the directory on every subsequent put.
+_EVICT_TARGET = 0.9
+
+
+class DocumentCache:
+    """
+    Content-addressed on-disk cache of serialized Document AI `Document` protos.
+
+    Entries are keyed by the SHA-256 of the file bytes plus the processor
+    resource name, stored as <cache_dir>/<key[:2]>/<key>.pb, and evicted in
+    least-recently-used order (file mtime is refreshed on every hit) once the
+    total size exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None  # computed lazily on first put
+
+    @classmethod
+    def from_env(cls) -> "DocumentCache":
+        return cls(
+            cache_dir=default_state_path("DOCAI_CACHE_DIR", DEFAULT_CACHE_DIR),
+            max_bytes=int(os.getenv("DOCAI_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+        )
+
+    @staticmethod
+    def make_key(content: bytes, processor_name: str) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        return hashlib.sha256(f"{processor_name}\0{digest}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pb")
+
+    def get(self, key: str):
+        """Return the cached bytes for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+
+        with self._lock:
+            # an overwrite (e.g. a --no-cache re-run) replaces the old entry
+            try:
+                replaced = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp, path)
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._total_bytes += len(data) - replaced
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        """Yield (path, size, mtime) for every cached entry."""
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".pb"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * _EVICT_TARGET
+        removed = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        self._total_bytes = total
+        logger.info(
+            f"Document AI cache: evicted {removed} entries ({total} bytes left)"
+        )
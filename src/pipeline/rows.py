@@ -0,0 +1,92 @@
+# File: src/pipeline/rows.py
+
+ROW_FIELDS = ("document_name", "doc_type", "field", "value", "page", "line_number")
+
+
+class ExtractedRow:
+    """A single extracted (field, value) pair; document-level data lives in
+    the owning DocumentRows. `text` is the stripped text the cleaned `value`
+    was derived from (None when not kept); it is not part of the row output."""
+
+    __slots__ = ("field", "value", "page", "line_number", "text")
+
+    def __init__(
+        self,
+        field: str,
+        value: str,
+        page: int = 0,
+        line_number: str = "",
+        text: str = None,
+    ):
+        self.field = field
+        self.value = value
+        self.page = page
+        self.line_number = line_number
+        self.text = text
+
+    def get(self, key: str, default=None):
+        """dict-style access to the row-level fields."""
+        if key in self.__slots__:
+            return getattr(self, key)
+        return default
+
+    def __eq__(self, other):
+        if not isinstance(other, ExtractedRow):
+            return NotImplemented
+        return (self.field, self.value, self.page, self.line_number) == (
+            other.field,
+            other.value,
+            other.page,
+            other.line_number,
+        )
+
+    def __repr__(self):
+        return (
+            f"ExtractedRow(field={self.field!r}, value={self.value!r}, "
+            f"page={self.page!r}, line_number={self.line_number!r})"
+        )
+
+
+class DocumentRows:
+    """
+    The extraction rows of one document. `document_name` and `doc_type` are
+    stored once instead of on every row; `dicts()` gives the flat per-row
+    dict view (ROW_FIELDS) used by the CSV and BigQuery writers.
+    """
+
+    __slots__ = ("document_name", "doc_type", "rows")
+
+    def __init__(self, document_name: str, doc_type: str, rows=None):
+        self.document_name = document_name
+        self.doc_type = doc_type
+        self.rows = list(rows) if rows is not None else []
+
+    def append(self, field: str, value: str, page: int = 0, line_number: str = ""):
+        self.rows.append(ExtractedRow(field, value, page, line_number))
+
+    def extend(self, rows):
+        self.rows.extend(rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+    def as_dict(self, row: ExtractedRow) -> dict:
+        return {
+            "document_name": self.document_name,
+            "doc_type": self.doc_type,
+            "field": row.field,
+            "value": row.value,
+            "page": row.page,
+            "line_number": row.line_number,
+        }
+
+    def dicts(self):
+        """Yield each row as a flat dict including the document-level fields."""
+        for row in self.rows:
+            yield self.as_dict(row)
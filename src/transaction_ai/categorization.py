@@ -1,26 +1,59 @@
 # src/transaction_ai/categorization.py
-from vertexai.language_models import TextGenerationModel  # For Gemini-Pro
+import json
 
+from src.utils.client_registry import get_client
 from src.utils.gcp_auth import init_vertex_ai_sdk
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-# Initialize Vertex AI SDK
-init_vertex_ai_sdk()
+GEMINI_MODEL_NAME = "gemini-pro"
+# Categories accepted besides the caller's own list.
+FALLBACK_CATEGORIES = ["Other", "Uncategorized"]
+# Transactions packed into one suggest_categories_batch prompt.
+DEFAULT_BATCH_SIZE = 50
+# Output budget per batched transaction ({"id": n, "category": "..."}).
+_OUTPUT_TOKENS_PER_ITEM = 24
+_MAX_OUTPUT_TOKENS = 8192
 
 
 def get_gemini_model():
-    """Gets the Gemini-Pro model for text generation."""
+    """Gets the Gemini-Pro model for text generation.
+    The Vertex AI SDK is imported and initialised on first use, not on import,
+    and the model handle is loaded once per process."""
+
+    def load():
+        from vertexai.language_models import TextGenerationModel  # For Gemini-Pro
+
+        init_vertex_ai_sdk()
+        return TextGenerationModel.from_pretrained(GEMINI_MODEL_NAME)
+
     try:
-        return TextGenerationModel.from_pretrained("gemini-pro")
+        return get_client(("gemini_model", GEMINI_MODEL_NAME), load)
     except Exception as e:
         logger.error(f"Error loading Gemini-Pro model: {e}")
         raise
 
 
+def _validate_category(
+    suggested_category: str, existing_categories: list, transaction_description: str
+) -> str:
+    # Basic validation: ensure the suggested category is one of the allowed ones, or a fallback
+    if (
+        suggested_category in existing_categories
+        or suggested_category in FALLBACK_CATEGORIES
+    ):
+        logger.info(f"Categorized '{transaction_description}' as: {suggested_category}")
+        return suggested_category
+    logger.warning(
+        f"Gemini suggested an unrecognized category '{suggested_category}' "
+        f"for '{transaction_description}'. Defaulting to 'Uncategorized'."
+    )
+    return "Uncategorized"
+
+
 def suggest_category_with_gemini(
-    transaction_description: str, existing_categories: list
+    transaction_description: str, existing_categories: list, model=None
 ) -> str:
     """
     Suggests an accounting category for a transaction using Gemini-Pro.
@@ -28,11 +61,12 @@ def suggest_category_with_gemini(
     Args:
         transaction_description (str): The description of the financial transaction.
         existing_categories (list): A list of valid accounting categories (e.g., ["Rent", "Utilities", "Salaries", "Office Supplies", "Travel Expenses"]).
+        model: Text model to use instead of get_gemini_model() (e.g. a fake).
 
     Returns:
         str: The suggested category or "Uncategorized" if not confident.
     """
-    model = get_gemini_model()
+    model = model or get_gemini_model()
 
     prompt = f"""
     You are an intelligent accounting assistant. Given a transaction description, categorize it into one of the following predefined categories. If none fit well, suggest 'Other' or 'Uncategorized'.
@@ -46,24 +80,108 @@ def suggest_category_with_gemini(
 
     try:
         response = model.predict(prompt=prompt, temperature=0.2, max_output_tokens=50)
-        suggested_category = response.text.strip()
-        # Basic validation: ensure the suggested category is one of the allowed ones, or a fallback
-        if suggested_category in existing_categories or suggested_category in [
-            "Other",
-            "Uncategorized",
-        ]:
-            logger.info(
-                f"Categorized '{transaction_description}' as: {suggested_category}"
+        return _validate_category(
+            response.text.strip(), existing_categories, transaction_description
+        )
+    except Exception as e:
+        logger.error(f"Error calling Gemini for categorization: {e}")
+        return "Categorization_Error"
+
+
+def _batch_prompt(descriptions: list, existing_categories: list) -> str:
+    items = [
+        {"id": i, "description": description}
+        for i, description in enumerate(descriptions, 1)
+    ]
+    return f"""
+    You are an intelligent accounting assistant. Categorize each transaction below into one of the following predefined categories. If none fit well, use 'Other' or 'Uncategorized'.
+
+    Available Categories: {', '.join(existing_categories)}.
+
+    Transactions (JSON):
+{json.dumps(items, ensure_ascii=False)}
+
+    Answer with only a JSON array holding one {{"id": <id>, "category": "<category>"}} object per transaction, in the same order.
+    """
+
+
+def _parse_batch_response(text: str) -> dict:
+    """{id: category} from a batched response (tolerates ``` fences)."""
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end < start:
+        raise ValueError(f"no JSON array in response: {text[:200]!r}")
+    parsed = {}
+    for item in json.loads(text[start : end + 1]):
+        if isinstance(item, dict) and "id" in item:
+            parsed[int(item["id"])] = str(item.get("category", "")).strip()
+    return parsed
+
+
+def _chunk_request(descriptions: list, existing_categories: list):
+    """(prompt, max_output_tokens) of the batched request for one chunk."""
+    prompt = _batch_prompt(descriptions, existing_categories)
+    max_tokens = min(
+        _MAX_OUTPUT_TOKENS, 64 + _OUTPUT_TOKENS_PER_ITEM * len(descriptions)
+    )
+    return prompt, max_tokens
+
+
+def _chunk_categories(parsed: dict, descriptions: list, existing_categories: list):
+    """Validated categories of a chunk from its parsed {id: category} response."""
+    categories = []
+    for i, description in enumerate(descriptions, 1):
+        if i not in parsed:
+            logger.warning(
+                f"Gemini returned no category for '{description}'. "
+                f"Defaulting to 'Uncategorized'."
             )
-            return suggested_category
+            categories.append("Uncategorized")
         else:
-            logger.warning(
-                f"Gemini suggested an unrecognized category '{suggested_category}' for '{transaction_description}'. Defaulting to 'Uncategorized'."
+            categories.append(
+                _validate_category(parsed[i], existing_categories, description)
             )
-            return "Uncategorized"
+    return categories
+
+
+def _categorize_chunk(model, descriptions: list, existing_categories: list) -> list:
+    prompt, max_tokens = _chunk_request(descriptions, existing_categories)
+    try:
+        response = model.predict(
+            prompt=prompt, temperature=0.2, max_output_tokens=max_tokens
+        )
+        parsed = _parse_batch_response(response.text)
     except Exception as e:
-        logger.error(f"Error calling Gemini for categorization: {e}")
-        return "Categorization_Error"
+        logger.error(f"Error calling Gemini for batch categorization: {e}")
+        return ["Categorization_Error"] * len(descriptions)
+    return _chunk_categories(parsed, descriptions, existing_categories)
+
+
+def suggest_categories_batch(
+    descriptions: list,
+    existing_categories: list,
+    model=None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> list:
+    """
+    Suggests categories for many transactions, packing up to `batch_size`
+    distinct descriptions into each Gemini request.
+
+    Returns one category per description, in input order, validated like
+    suggest_category_with_gemini(). A request that fails or cannot be parsed
+    yields "Categorization_Error" for each of its transactions.
+    """
+    model = model or get_gemini_model()
+    unique = list(dict.fromkeys(descriptions))  # repeated descriptions sent once
+    batch_size = max(1, batch_size)
+
+    by_description = {}
+    for start in range(0, len(unique), batch_size):
+        chunk = unique[start : start + batch_size]
+        for description, category in zip(
+            chunk, _categorize_chunk(model, chunk, existing_categories)
+        ):
+            by_description[description] = category
+    return [by_description[description] for description in descriptions]
 
 
 # For a custom endpoint, you would import and use get_aiplatform_endpoint_client
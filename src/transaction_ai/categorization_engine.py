@@ -0,0 +1,291 @@
+# src/transaction_ai/categorization_engine.py
+"""
+Concurrent Gemini categorisation under a requests/tokens-per-minute budget.
+
+CategorizationEngine keeps up to `max_in_flight` batched requests running,
+paces them with token buckets, and retries quota (429) and server (5xx)
+errors with jittered exponential backoff until a per-request deadline.
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.transaction_ai.categorization import (
+    DEFAULT_BATCH_SIZE,
+    _chunk_categories,
+    _chunk_request,
+    _parse_batch_response,
+    get_gemini_model,
+)
+from src.utils.client_registry import get_client
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv("GEMINI_MAX_IN_FLIGHT", "8"))
+DEFAULT_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+# 0 disables the token budget.
+DEFAULT_TOKENS_PER_MINUTE = float(os.getenv("GEMINI_TOKENS_PER_MINUTE", "0"))
+# Seconds a batched request may spend waiting, calling and retrying.
+DEFAULT_ITEM_DEADLINE = float(os.getenv("GEMINI_ITEM_DEADLINE", "120"))
+# Seconds of budget a bucket may accumulate while idle; kept short so no
+# minute sees much more than its budget.
+_BURST_SECONDS = 1
+_RETRYABLE_HTTP_CODES = {429, 500, 502, 503, 504}
+_RETRYABLE_GRPC_CODES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE", "INTERNAL"}
+
+
+class TokenBucket:
+    """
+    Rate limiter refilled continuously at `per_minute` units per minute, up
+    to `capacity` (default: _BURST_SECONDS worth). A request larger than the
+    capacity waits for a full bucket and leaves it in debt, so oversized
+    requests are still admitted at the configured average rate. Safe to
+    share between threads.
+    """
+
+    def __init__(self, per_minute: float, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or max(1.0, self.rate * _BURST_SECONDS)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0, deadline=None) -> bool:
+        """
+        Block until `amount` can be taken. Returns False, taking nothing, if
+        that would be after `deadline` (a time.monotonic() value).
+        """
+        needed = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= needed:
+                    self.tokens -= amount
+                    return True
+                wait = (needed - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def release(self, amount: float = 1.0):
+        """Give back `amount` taken by acquire() for a request not sent."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for quota (429) and transient server (5xx) errors."""
+    try:
+        from google.api_core import exceptions as api_exceptions
+    except ImportError:
+        api_exceptions = None
+    if api_exceptions is not None and isinstance(
+        error,
+        (
+            api_exceptions.TooManyRequests,
+            api_exceptions.ResourceExhausted,
+            api_exceptions.InternalServerError,
+            api_exceptions.BadGateway,
+            api_exceptions.ServiceUnavailable,
+            api_exceptions.GatewayTimeout,
+        ),
+    ):
+        return True
+    code = getattr(error, "code", None)
+    if callable(code):  # grpc.RpcError
+        code = code()
+    if isinstance(code, int):
+        return code in _RETRYABLE_HTTP_CODES
+    return getattr(code, "name", None) in _RETRYABLE_GRPC_CODES
+
+
+class EngineStats:
+    """
+    Counters of one CategorizationEngine.categorize() run. throttled_seconds
+    is the time requests spent waiting for the rate limiter, summed over
+    workers.
+    """
+
+    def __init__(self):
+        self.items = 0
+        self.requests = 0
+        self.retries = 0
+        self.failed_requests = 0
+        self.tokens = 0
+        self.throttled_seconds = 0.0
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def summary(self) -> dict:
+        elapsed = self.elapsed or (time.monotonic() - self.started)
+        return {
+            "items": self.items,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failed_requests": self.failed_requests,
+            "estimated_tokens": self.tokens,
+            "throttled_seconds": round(self.throttled_seconds, 3),
+            "elapsed_seconds": round(elapsed, 3),
+            "items_per_second": round(self.items / elapsed, 2) if elapsed else 0.0,
+            "requests_per_minute": (
+                round(60 * self.requests / elapsed, 1) if elapsed else 0.0
+            ),
+        }
+
+
+class CategorizationEngine:
+    """
+    Categorises transactions with up to `max_in_flight` concurrent batched
+    Gemini requests of `batch_size` descriptions, within the requests- and
+    tokens-per-minute budgets (0 disables a budget).
+
+    A request failing with a retryable error is retried with full-jitter
+    exponential backoff (base_delay * 2**attempt, capped at max_delay) as
+    long as the retry can start before `item_deadline` seconds have passed
+    since the request was first attempted. A request that still fails, or
+    fails with any other error, yields "Categorization_Error" for each of
+    its transactions, as in suggest_categories_batch(). Statistics of the
+    last run are kept in `stats`.
+    """
+
+    def __init__(
+        self,
+        model=None,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        item_deadline: float = DEFAULT_ITEM_DEADLINE,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+    ):
+        self.model = model
+        self.max_in_flight = max(1, max_in_flight)
+        self.request_bucket = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        )
+        self.batch_size = max(1, batch_size)
+        self.item_deadline = item_deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = EngineStats()
+        self._random = random.Random()
+
+    @classmethod
+    def from_env(cls) -> "CategorizationEngine":
+        return cls()
+
+    def _throttle(self, stats, tokens: int, deadline: float) -> bool:
+        started = time.monotonic()
+        taken = []
+        admitted = True
+        for bucket, amount in ((self.request_bucket, 1), (self.token_bucket, tokens)):
+            if bucket is None:
+                continue
+            if not bucket.acquire(amount, deadline):
+                # the request is not sent: refund the buckets already taken
+                for taken_bucket, taken_amount in taken:
+                    taken_bucket.release(taken_amount)
+                admitted = False
+                break
+            taken.append((bucket, amount))
+        stats.add(throttled_seconds=time.monotonic() - started)
+        return admitted
+
+    def _run_chunk(self, stats, model, chunk: list, existing_categories: list):
+        prompt, max_tokens = _chunk_request(chunk, existing_categories)
+        # rough estimate: ~4 characters per token, plus the output budget
+        tokens = len(prompt) // 4 + max_tokens
+        deadline = time.monotonic() + self.item_deadline
+        attempt = 0
+        while True:
+            if not self._throttle(stats, tokens, deadline):
+                logger.error(
+                    f"Rate limit left no time to categorize {len(chunk)} transactions"
+                    f" within {self.item_deadline}s."
+                )
+                break
+            stats.add(requests=1, tokens=tokens)
+            try:
+                response = model.predict(
+                    prompt=prompt, temperature=0.2, max_output_tokens=max_tokens
+                )
+                parsed = _parse_batch_response(response.text)
+            except Exception as e:
+                delay = self._random.uniform(
+                    0, min(self.max_delay, self.base_delay * 2**attempt)
+                )
+                if is_retryable(e) and time.monotonic() + delay < deadline:
+                    logger.warning(
+                        f"Gemini request failed ({e}); retrying in {delay:.1f}s"
+                    )
+                    stats.add(retries=1)
+                    attempt += 1
+                    time.sleep(delay)
+                    continue
+                logger.error(f"Error calling Gemini for batch categorization: {e}")
+                break
+            return _chunk_categories(parsed, chunk, existing_categories)
+
+        stats.add(failed_requests=1)
+        return ["Categorization_Error"] * len(chunk)
+
+    def categorize(self, descriptions: list, existing_categories: list) -> list:
+        """
+        Same contract as suggest_categories_batch(): one validated category
+        per description, in input order; repeated descriptions are sent once.
+        """
+        model = self.model or get_gemini_model()
+        unique = list(dict.fromkeys(descriptions))
+        chunks = [
+            unique[start : start + self.batch_size]
+            for start in range(0, len(unique), self.batch_size)
+        ]
+        stats = EngineStats()
+
+        by_description = {}
+        if chunks:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_in_flight, len(chunks)),
+                thread_name_prefix="gemini",
+            ) as pool:
+                results = pool.map(
+                    lambda chunk: self._run_chunk(
+                        stats, model, chunk, existing_categories
+                    ),
+                    chunks,
+                )
+                for chunk, categories in zip(chunks, results):
+                    by_description.update(zip(chunk, categories))
+
+        stats.items = len(unique)
+        stats.elapsed = time.monotonic() - stats.started
+        self.stats = stats
+        logger.info(f"Categorization engine run: {stats.summary()}")
+        return [by_description[description] for description in descriptions]
+
+
+def get_categorization_engine() -> CategorizationEngine:
+    """Return the process-wide CategorizationEngine (one shared rate budget)."""
+    return get_client("categorization_engine", CategorizationEngine.from_env)
@@ -0,0 +1,279 @@
+# src/transaction_ai/category_cache.py
+"""
+Memo of categorisation results keyed on normalised transaction descriptions,
+so recurring merchants are sent to Gemini once rather than on every
+occurrence.
+"""
+
+import datetime
+import hashlib
+import os
+import re
+from collections import OrderedDict
+
+from src.transaction_ai.categorization import (
+    DEFAULT_BATCH_SIZE,
+    FALLBACK_CATEGORIES,
+    suggest_categories_batch,
+    suggest_category_with_gemini,
+)
+from src.utils.client_registry import get_client
+from src.utils.local_state import SQLiteStore, default_state_path
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MEMO_PATH = os.path.join("data", "cache", "categories.sqlite")
+# Normalised descriptions kept in memory in front of the SQLite store.
+DEFAULT_LRU_SIZE = int(os.getenv("CATEGORY_MEMO_LRU_SIZE", "20000"))
+
+# "$1,234.50", "12.99 EUR", "-45.00"
+_AMOUNT_RE = re.compile(
+    r"[$€£]\s*-?\d[\d,]*(?:\.\d+)?|-?\d[\d,]*\.\d{2}\b(?:\s*(?:usd|eur|gbp)\b)?"
+)
+_NON_WORD_RE = re.compile(r"[\W_]+")
+_DIGITS_RE = re.compile(r"\d+")
+_SPACES_RE = re.compile(r"\s+")
+# Results that say nothing about the merchant and must not be memoised:
+# failed requests, and "Uncategorized", which is also the placeholder for
+# ids missing from a batch reply and for unrecognised categories.
+_UNCACHEABLE = {"Categorization_Error", "Uncategorized"}
+
+
+def normalize_description(description: str):
+    """
+    Cache key for a transaction description: lower-cased, with amounts,
+    digits (dates, store and reference numbers) and punctuation removed.
+    "COMCAST #8841 05/02 $89.99" and "Comcast #1207 06/02 $91.20" both give
+    "comcast". Returns None when nothing is left to key on.
+    """
+    if not description:
+        return None
+    text = _AMOUNT_RE.sub(" ", description.lower())
+    text = _NON_WORD_RE.sub(" ", text)
+    text = _DIGITS_RE.sub(" ", text)
+    text = _SPACES_RE.sub(" ", text).strip()
+    return text or None
+
+
+def categories_fingerprint(categories) -> str:
+    """Stable ID of a category list; suggestions are only valid for it."""
+    joined = "\0".join(sorted(set(categories)))
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()[:16]
+
+
+class CategoryMemo(SQLiteStore):
+    """
+    Memo of categories per normalised description for one category list.
+
+    Lookups go to an in-memory LRU, then to a SQLite store shared across
+    runs. User-confirmed categories (categorization_user_confirmed) take
+    precedence over AI suggestions. AI suggestions are stored under the
+    category list's fingerprint, so changing the list invalidates them;
+    several lists can share one store, and purge_stale() drops the
+    suggestions made for other lists. A confirmed category is used while
+    it is still in the list. Safe to share between threads.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS confirmed (
+        key TEXT PRIMARY KEY, category TEXT NOT NULL, updated_at TEXT);
+    CREATE TABLE IF NOT EXISTS suggested (
+        key TEXT NOT NULL, fingerprint TEXT NOT NULL,
+        category TEXT NOT NULL, updated_at TEXT,
+        PRIMARY KEY (key, fingerprint));
+    """
+
+    def __init__(
+        self, categories, path: str = DEFAULT_MEMO_PATH, max_entries=DEFAULT_LRU_SIZE
+    ):
+        self.categories = list(categories)
+        self.allowed = set(self.categories) | set(FALLBACK_CATEGORIES)
+        self.fingerprint = categories_fingerprint(self.categories)
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lru = OrderedDict()  # key -> category
+        super().__init__(path)
+
+    @classmethod
+    def from_env(cls, categories) -> "CategoryMemo":
+        return cls(
+            categories, default_state_path("CATEGORY_MEMO_PATH", DEFAULT_MEMO_PATH)
+        )
+
+    def _remember(self, key, category):
+        self._lru[key] = category
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get(self, description: str):
+        """Memoised category for this description, or None."""
+        key = normalize_description(description)
+        if key is None:
+            return None
+        with self._lock:
+            category = self._lru.get(key)
+            if category is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return category
+            row = self._conn.execute(
+                "SELECT category FROM confirmed WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[0] not in self.allowed:
+                row = self._conn.execute(
+                    "SELECT category FROM suggested WHERE key = ? AND fingerprint = ?",
+                    (key, self.fingerprint),
+                ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._remember(key, row[0])
+            self.hits += 1
+            return row[0]
+
+    def put(self, description: str, category: str):
+        """Memoise an AI suggestion (never overrides a confirmed category)."""
+        key = normalize_description(description)
+        if key is None or category in _UNCACHEABLE:
+            return
+        self.put_many([(key, category)], normalized=True)
+
+    def put_many(self, pairs, normalized=False):
+        """Memoise (description, category) AI suggestions in one transaction."""
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        rows = []
+        for description, category in pairs:
+            key = description if normalized else normalize_description(description)
+            if key is not None and category not in _UNCACHEABLE:
+                rows.append((key, self.fingerprint, category, now))
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO suggested VALUES (?, ?, ?, ?)", rows
+            )
+            # the next get() loads them, checking for a confirmed category first
+            for key, _, _, _ in rows:
+                self._lru.pop(key, None)
+
+    def purge_stale(self) -> int:
+        """
+        Maintenance: delete the stored suggestions made for any other
+        category list. Returns the number of suggestions deleted.
+        """
+        with self._lock, self._conn:
+            purged = self._conn.execute(
+                "DELETE FROM suggested WHERE fingerprint != ?", (self.fingerprint,)
+            ).rowcount
+        if purged:
+            logger.info(f"Dropped {purged} suggestions cached for other category lists")
+        return purged
+
+    def confirm(self, description: str, category: str):
+        """Record a user-confirmed category; it wins over any suggestion."""
+        self.load_confirmed(
+            [{"description": description, "categorization_user_confirmed": category}]
+        )
+
+    def load_confirmed(self, rows):
+        """
+        Record the user-confirmed categories of transaction rows (dicts with
+        "description" and "categorization_user_confirmed", as in the
+        transactions table). Rows without a confirmed category are ignored.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        confirmed = {}
+        for row in rows:
+            category = row.get("categorization_user_confirmed")
+            key = normalize_description(row.get("description"))
+            if category and key is not None:
+                confirmed[key] = category
+        if not confirmed:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO confirmed VALUES (?, ?, ?)",
+                [(key, category, now) for key, category in confirmed.items()],
+            )
+            for key, category in confirmed.items():
+                if category in self.allowed:
+                    self._remember(key, category)
+                else:
+                    self._lru.pop(key, None)
+        return len(confirmed)
+
+
+def get_category_memo(existing_categories) -> CategoryMemo:
+    """Return the process-wide CategoryMemo for this category list."""
+    return get_client(
+        ("category_memo", categories_fingerprint(existing_categories)),
+        lambda: CategoryMemo.from_env(existing_categories),
+    )
+
+
+def suggest_category_cached(
+    transaction_description: str, existing_categories: list, memo=None, model=None
+) -> str:
+    """suggest_category_with_gemini() behind the memo."""
+    memo = memo or get_category_memo(existing_categories)
+    category = memo.get(transaction_description)
+    if category is not None:
+        return category
+    category = suggest_category_with_gemini(
+        transaction_description, existing_categories, model=model
+    )
+    memo.put(transaction_description, category)
+    return category
+
+
+def suggest_categories_cached(
+    descriptions: list,
+    existing_categories: list,
+    memo=None,
+    model=None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    engine=None,
+) -> list:
+    """
+    suggest_categories_batch() behind the memo: only descriptions whose
+    normalised form is not memoised are sent to Gemini, once each. With an
+    `engine` (a CategorizationEngine) they are sent through it instead, as
+    concurrent rate-limited requests.
+    """
+    memo = memo or get_category_memo(existing_categories)
+    categories = [memo.get(description) for description in descriptions]
+
+    # one representative description per uncached key
+    pending = {}
+    for description, category in zip(descriptions, categories):
+        if category is None:
+            key = normalize_description(description) or description
+            pending.setdefault(key, description)
+    if pending and engine is not None:
+        suggested = engine.categorize(list(pending.values()), existing_categories)
+    elif pending:
+        suggested = suggest_categories_batch(
+            list(pending.values()),
+            existing_categories,
+            model=model,
+            batch_size=batch_size,
+        )
+    if pending:
+        by_key = dict(zip(pending, suggested))
+        memo.put_many(zip(pending.values(), suggested))
+        categories = [
+            (
+                by_key[normalize_description(description) or description]
+                if category is None
+                else category
+            )
+            for description, category in zip(descriptions, categories)
+        ]
+    logger.info(
+        f"Categorized {len(descriptions)} transactions; "
+        f"{len(pending)} distinct descriptions sent to Gemini"
+    )
+    return categories
@@ -0,0 +1,377 @@
+# src/transaction_ai/local_classifier.py
+"""
+Local first-pass transaction categoriser trained on user-confirmed categories.
+
+A multinomial logistic regression over hashed word and character n-grams of
+the normalised description, trained with SGD in pure Python. Predictions take
+microseconds; only transactions it is not confident about go to Gemini.
+
+Usage: python -m src.transaction_ai.local_classifier retrain (--csv FILE | --bigquery)
+       python -m src.transaction_ai.local_classifier report (--csv FILE | --bigquery)
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+import time
+import zlib
+
+from src.transaction_ai.categorization import DEFAULT_BATCH_SIZE
+from src.transaction_ai.category_cache import (
+    normalize_description,
+    suggest_categories_cached,
+)
+from src.utils.client_registry import get_client
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MODEL_PATH = os.path.join("data", "models", "category_classifier.json")
+# Predictions below this probability are sent to Gemini instead.
+DEFAULT_THRESHOLD = float(os.getenv("CATEGORY_CLASSIFIER_THRESHOLD", "0.8"))
+DEFAULT_BUCKETS = 2**18
+# Share of a description's n-grams that must have been seen in training
+# (with at least one whole word) for the model to answer; below it the
+# probabilities only reflect the class prior, so confidence is 0.
+MIN_KNOWN_FEATURES = 0.5
+# Share of normalised descriptions held out by `report`.
+_HOLDOUT_PERCENT = 20
+
+
+def _bucket(feature: str, n_buckets: int) -> int:
+    # crc32 rather than hash(): stable across processes, so saved models work
+    return zlib.crc32(feature.encode("utf-8")) % n_buckets
+
+
+class HashedNgramClassifier:
+    """
+    Softmax regression over hashed n-grams: word unigrams and bigrams plus
+    character trigrams of each word, all taken from normalize_description().
+    Weights are stored sparsely (bucket -> per-class weights).
+    """
+
+    def __init__(
+        self,
+        n_buckets: int = DEFAULT_BUCKETS,
+        epochs: int = 8,
+        learning_rate: float = 0.5,
+        seed: int = 0,
+    ):
+        self.n_buckets = n_buckets
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.seed = seed
+        self.classes = []
+        self.bias = []
+        self.weights = {}
+
+    def _grams(self, description: str):
+        """(word n-grams, character n-grams) of the normalised description."""
+        key = normalize_description(description)
+        if key is None:
+            return [], []
+        words = key.split()
+        grams = [f"w:{w}" for w in words]
+        grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+        chars = []
+        for w in words:
+            padded = f"<{w}>"
+            chars += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        return grams, chars
+
+    def features(self, description: str) -> list:
+        grams, chars = self._grams(description)
+        return sorted({_bucket(g, self.n_buckets) for g in grams + chars})
+
+    def _scores(self, buckets: list) -> list:
+        value = 1.0 / math.sqrt(len(buckets)) if buckets else 0.0
+        scores = list(self.bias)
+        for b in buckets:
+            w = self.weights.get(b)
+            if w is not None:
+                for k, wk in enumerate(w):
+                    scores[k] += wk * value
+        return scores
+
+    @staticmethod
+    def _softmax(scores: list) -> list:
+        top = max(scores)
+        exps = [math.exp(s - top) for s in scores]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def fit(self, descriptions, labels):
+        """Train from scratch on (description, confirmed category) pairs."""
+        data = [
+            (self.features(d), label)
+            for d, label in zip(descriptions, labels)
+            if label and normalize_description(d) is not None
+        ]
+        self.classes = sorted({label for _, label in data})
+        index = {label: k for k, label in enumerate(self.classes)}
+        n = len(self.classes)
+        self.bias = [0.0] * n
+        self.weights = {}
+        rng = random.Random(self.seed)
+
+        for epoch in range(self.epochs):
+            rng.shuffle(data)
+            lr = self.learning_rate / (1 + epoch)
+            for buckets, label in data:
+                probs = self._softmax(self._scores(buckets))
+                probs[index[label]] -= 1.0  # gradient of the log loss
+                value = 1.0 / math.sqrt(len(buckets)) if buckets else 0.0
+                for k in range(n):
+                    self.bias[k] -= lr * probs[k]
+                step = [lr * p * value for p in probs]
+                for b in buckets:
+                    w = self.weights.get(b)
+                    if w is None:
+                        w = self.weights[b] = [0.0] * n
+                    for k in range(n):
+                        w[k] -= step[k]
+        return self
+
+    def predict(self, description: str):
+        """
+        (category, probability) for one description; (None, 0.0) if untrained.
+        The probability is 0.0 when the model cannot tell categories apart:
+        it was trained on fewer than two, or too few of the description's
+        n-grams (or none of its words) were seen in training.
+        """
+        if not self.classes:
+            return None, 0.0
+        grams, chars = self._grams(description)
+        words = {_bucket(g, self.n_buckets) for g in grams}
+        buckets = sorted(words | {_bucket(g, self.n_buckets) for g in chars})
+        probs = self._softmax(self._scores(buckets))
+        k = max(range(len(probs)), key=probs.__getitem__)
+        known = sum(1 for b in buckets if b in self.weights)
+        if (
+            len(self.classes) < 2
+            or not any(b in self.weights for b in words)
+            or known < MIN_KNOWN_FEATURES * len(buckets)
+        ):
+            return self.classes[k], 0.0
+        return self.classes[k], probs[k]
+
+    def save(self, path: str = DEFAULT_MODEL_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        state = {
+            "version": 1,
+            "n_buckets": self.n_buckets,
+            "classes": self.classes,
+            "bias": [round(b, 6) for b in self.bias],
+            "weights": {
+                str(b): [round(x, 6) for x in w] for b, w in self.weights.items()
+            },
+        }
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> "HashedNgramClassifier":
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        model = cls(n_buckets=state["n_buckets"])
+        model.classes = state["classes"]
+        model.bias = state["bias"]
+        model.weights = {int(b): w for b, w in state["weights"].items()}
+        return model
+
+
+def get_local_classifier():
+    """The process-wide classifier loaded from CATEGORY_CLASSIFIER_PATH, or None."""
+    path = os.getenv("CATEGORY_CLASSIFIER_PATH", DEFAULT_MODEL_PATH)
+    if not os.path.exists(path):
+        return None
+    return get_client(
+        ("category_classifier", path), lambda: HashedNgramClassifier.load(path)
+    )
+
+
+def categorize_transactions(
+    descriptions: list,
+    existing_categories: list,
+    classifier=None,
+    threshold: float = DEFAULT_THRESHOLD,
+    model=None,
+    memo=None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    engine=None,
+) -> list:
+    """
+    Categorise transactions with the local classifier first. Predictions
+    below `threshold`, or outside existing_categories, fall back to Gemini
+    through suggest_categories_cached() (and `engine`, if given). Returns
+    one category per description, in input order.
+    """
+    classifier = classifier if classifier is not None else get_local_classifier()
+    allowed = set(existing_categories)
+    categories = [None] * len(descriptions)
+    fallback = []
+    for i, description in enumerate(descriptions):
+        if classifier is not None:
+            category, confidence = classifier.predict(description)
+            if category in allowed and confidence >= threshold:
+                categories[i] = category
+                continue
+        fallback.append(i)
+
+    if fallback:
+        suggested = suggest_categories_cached(
+            [descriptions[i] for i in fallback],
+            existing_categories,
+            memo=memo,
+            model=model,
+            batch_size=batch_size,
+            engine=engine,
+        )
+        for i, category in zip(fallback, suggested):
+            categories[i] = category
+    logger.info(
+        f"Categorized {len(descriptions)} transactions: "
+        f"{len(descriptions) - len(fallback)} locally, {len(fallback)} via Gemini"
+    )
+    return categories
+
+
+def load_confirmed_csv(path: str):
+    """(descriptions, categories) from a CSV with description and
+    categorization_user_confirmed columns."""
+    descriptions, labels = [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get("categorization_user_confirmed"):
+                descriptions.append(row.get("description") or "")
+                labels.append(row["categorization_user_confirmed"])
+    return descriptions, labels
+
+
+def load_confirmed_bigquery(client=None, limit=None):
+    """(descriptions, categories) of confirmed rows in the transactions table."""
+    from config.settings import BQ_DATASET_ID, BQ_TRANSACTIONS_TABLE, GCP_PROJECT_ID
+    from src.utils.gcp_auth import get_bigquery_client
+
+    client = client or get_bigquery_client()
+    sql = (
+        "SELECT description, categorization_user_confirmed "
+        f"FROM `{GCP_PROJECT_ID}.{BQ_DATASET_ID}.{BQ_TRANSACTIONS_TABLE}` "
+        "WHERE categorization_user_confirmed IS NOT NULL"
+    )
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    descriptions, labels = [], []
+    for row in client.query(sql).result():
+        descriptions.append(row["description"] or "")
+        labels.append(row["categorization_user_confirmed"])
+    return descriptions, labels
+
+
+def evaluate(classifier, descriptions, labels, threshold=DEFAULT_THRESHOLD) -> dict:
+    """Accuracy, coverage at `threshold` and per-prediction latency."""
+    latencies, correct, covered, covered_correct = [], 0, 0, 0
+    for description, label in zip(descriptions, labels):
+        started = time.perf_counter()
+        category, confidence = classifier.predict(description)
+        latencies.append(time.perf_counter() - started)
+        correct += category == label
+        if confidence >= threshold:
+            covered += 1
+            covered_correct += category == label
+    n = len(latencies)
+    latencies.sort()
+    return {
+        "examples": n,
+        "accuracy": correct / n if n else 0.0,
+        "coverage": covered / n if n else 0.0,
+        "accuracy_covered": covered_correct / covered if covered else 0.0,
+        "latency_us_p50": latencies[n // 2] * 1e6 if n else 0.0,
+        "latency_us_p99": latencies[min(n - 1, n * 99 // 100)] * 1e6 if n else 0.0,
+    }
+
+
+def _split(descriptions, labels):
+    """Hold out whole normalised descriptions, so repeats do not leak."""
+    train, test = ([], []), ([], [])
+    for description, label in zip(descriptions, labels):
+        key = normalize_description(description) or ""
+        target = test if zlib.crc32(key.encode()) % 100 < _HOLDOUT_PERCENT else train
+        target[0].append(description)
+        target[1].append(label)
+    return train, test
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m src.transaction_ai.local_classifier",
+        description="Train and evaluate the local transaction categoriser.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (
+        ("retrain", "train on all confirmed rows and save the model"),
+        ("report", "held-out accuracy, coverage and latency"),
+    ):
+        cmd = sub.add_parser(name, help=help_text)
+        source = cmd.add_mutually_exclusive_group(required=True)
+        source.add_argument("--csv", help="CSV of confirmed transactions")
+        source.add_argument(
+            "--bigquery", action="store_true", help="read the transactions table"
+        )
+        cmd.add_argument(
+            "--model",
+            default=os.getenv("CATEGORY_CLASSIFIER_PATH", DEFAULT_MODEL_PATH),
+            help="model file to write (retrain) or also evaluate (report)",
+        )
+        cmd.add_argument("--epochs", type=int, default=8)
+        cmd.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.csv:
+        descriptions, labels = load_confirmed_csv(args.csv)
+    else:
+        descriptions, labels = load_confirmed_bigquery()
+    if not descriptions:
+        logger.error("No confirmed transactions to learn from.")
+        return 1
+
+    if args.command == "retrain":
+        started = time.perf_counter()
+        classifier = HashedNgramClassifier(epochs=args.epochs).fit(descriptions, labels)
+        classifier.save(args.model)
+        print(
+            f"Trained on {len(descriptions)} rows, {len(classifier.classes)} "
+            f"categories in {time.perf_counter() - started:.1f}s -> {args.model}"
+        )
+        return 0
+
+    (train_x, train_y), (test_x, test_y) = _split(descriptions, labels)
+    reports = {}
+    if train_x and test_x:
+        classifier = HashedNgramClassifier(epochs=args.epochs).fit(train_x, train_y)
+        reports["held-out"] = evaluate(classifier, test_x, test_y, args.threshold)
+    if os.path.exists(args.model):
+        saved = HashedNgramClassifier.load(args.model)
+        reports[f"saved model (all rows, threshold {args.threshold})"] = evaluate(
+            saved, descriptions, labels, args.threshold
+        )
+    for name, report in reports.items():
+        print(f"{name}:")
+        for key, value in report.items():
+            print(
+                f"  {key:18} {value:.4f}"
+                if isinstance(value, float)
+                else f"  {key:18} {value}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
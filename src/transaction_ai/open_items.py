@@ -0,0 +1,248 @@
+# src/transaction_ai/open_items.py
+"""
+Incremental reconciliation: unmatched bank and GL transactions are kept in a
+local SQLite open-items ledger, and each run only matches the new
+transactions (deltas) against the open items they could pair with.
+"""
+
+import datetime
+import json
+import os
+
+from src.transaction_ai.reconciliation import (
+    _day,
+    as_rows,
+    match_key,
+    match_pairs,
+)
+from src.utils.client_registry import get_client
+from src.utils.local_state import SQLiteStore, default_state_path
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_LEDGER_PATH = os.path.join("data", "reconciliation", "open_items.sqlite")
+BANK, GL = "bank", "gl"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS open_items (
+    item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    side TEXT NOT NULL,
+    day INTEGER,
+    amount_cents INTEGER,
+    payload TEXT NOT NULL,
+    added_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS matches (
+    bank_payload TEXT NOT NULL,
+    gl_payload TEXT NOT NULL,
+    score REAL NOT NULL,
+    matched_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS seen_ids (
+    side TEXT NOT NULL,
+    external_id TEXT NOT NULL,
+    PRIMARY KEY (side, external_id)
+);
+CREATE INDEX IF NOT EXISTS open_items_side_day
+    ON open_items(side, day, amount_cents);
+"""
+
+
+def _payload(row: dict) -> str:
+    # Decimals and dates are stored as strings; match_key() reads them back
+    return json.dumps(row, default=str, sort_keys=True)
+
+
+def _day_ranges(days, window: int) -> list:
+    """Merged [first, last] day ranges covering window days around each day."""
+    ranges = []
+    for day in sorted(days):
+        if ranges and day - window <= ranges[-1][1] + 1:
+            ranges[-1][1] = day + window
+        else:
+            ranges.append([day - window, day + window])
+    return ranges
+
+
+class OpenItemsLedger(SQLiteStore):
+    """
+    Open (unmatched) bank and GL transactions, indexed on (side, day,
+    amount). reconcile() takes only the new transactions since the last
+    run: they are matched, with reconcile_transactions() rules, together
+    with the open items within `date_window_days` of their dates, so a
+    daily run costs in proportion to that day's transactions rather than
+    the history. Matched open items are removed and recorded in `matches`;
+    new transactions left unmatched become open items (those without a
+    usable amount or date stay open until removed by hand).
+
+    With an `id_field`, transactions whose id was already seen on the same
+    side are skipped, so a delta may safely be submitted twice. Safe to
+    share between threads.
+    """
+
+    SCHEMA = _SCHEMA
+    WAL = True
+
+    def __init__(
+        self,
+        path: str = DEFAULT_LEDGER_PATH,
+        date_window_days: int = 0,
+        amount_tolerance=0,
+        id_field=None,
+    ):
+        self.date_window_days = max(0, int(date_window_days or 0))
+        self.amount_tolerance = amount_tolerance
+        self.id_field = id_field
+        super().__init__(path)
+
+    @classmethod
+    def from_env(cls) -> "OpenItemsLedger":
+        return cls(
+            default_state_path("OPEN_ITEMS_PATH", DEFAULT_LEDGER_PATH),
+            date_window_days=int(os.getenv("RECONCILE_DATE_WINDOW_DAYS", "0")),
+            amount_tolerance=os.getenv("RECONCILE_AMOUNT_TOLERANCE", "0"),
+            id_field=os.getenv("RECONCILE_ID_FIELD") or None,
+        )
+
+    def _new_rows(self, side: str, rows: list) -> list:
+        """Rows whose id has not been seen on this side (all rows without id_field)."""
+        if not self.id_field:
+            return rows
+        new = []
+        for row in rows:
+            external_id = row.get(self.id_field)
+            if external_id is None:
+                new.append(row)
+                continue
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO seen_ids VALUES (?, ?)", (side, str(external_id))
+            )
+            if cursor.rowcount:
+                new.append(row)
+        return new
+
+    def _open_items(self, side: str, days) -> list:
+        """(item_id, row) of open items within the date window of `days`."""
+        items = []
+        for first, last in _day_ranges(days, self.date_window_days):
+            cursor = self._conn.execute(
+                "SELECT item_id, payload FROM open_items "
+                "WHERE side = ? AND day BETWEEN ? AND ? ORDER BY item_id",
+                (side, first, last),
+            )
+            items.extend((item_id, json.loads(p)) for item_id, p in cursor)
+        return items
+
+    def reconcile(self, bank_delta=(), gl_delta=()) -> dict:
+        """
+        Match new bank and GL transactions (lists of dicts or dicts of
+        column lists) against each other and the open items.
+
+        Returns:
+            dict: {"matches": [{"bank_tx", "gl_tx", "score"}] made in this
+            run, "unmatched_bank": [...], "unmatched_gl": [...]} where the
+            unmatched lists hold the new transactions that are now open.
+            Open items come back as stored, with dates and amounts as
+            strings. open_items() lists everything still open.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self._lock, self._conn:
+            new_bank = self._new_rows(BANK, as_rows(bank_delta))
+            new_gl = self._new_rows(GL, as_rows(gl_delta))
+            new_bank_keys = [match_key(r) for r in new_bank]
+            new_gl_keys = [match_key(r) for r in new_gl]
+            days = {_day(k[1]) for k in new_bank_keys + new_gl_keys if k is not None}
+
+            # open items first, so exact matches pair oldest entries first
+            old_bank = self._open_items(BANK, days)
+            old_gl = self._open_items(GL, days)
+            bank_rows = [row for _, row in old_bank] + new_bank
+            gl_rows = [row for _, row in old_gl] + new_gl
+            pairs = match_pairs(
+                [match_key(r) for r in bank_rows[: len(old_bank)]] + new_bank_keys,
+                [match_key(r) for r in gl_rows[: len(old_gl)]] + new_gl_keys,
+                self.date_window_days,
+                self.amount_tolerance,
+            )
+
+            bank_matched = bytearray(len(bank_rows))
+            gl_matched = bytearray(len(gl_rows))
+            matches = []
+            for i, j, score in pairs:
+                bank_matched[i] = gl_matched[j] = 1
+                matches.append(
+                    {"bank_tx": bank_rows[i], "gl_tx": gl_rows[j], "score": score}
+                )
+
+            closed = [
+                (item_id,)
+                for items, matched in ((old_bank, bank_matched), (old_gl, gl_matched))
+                for k, (item_id, _) in enumerate(items)
+                if matched[k]
+            ]
+            self._conn.executemany("DELETE FROM open_items WHERE item_id = ?", closed)
+            self._conn.executemany(
+                "INSERT INTO matches VALUES (?, ?, ?, ?)",
+                [
+                    (_payload(m["bank_tx"]), _payload(m["gl_tx"]), m["score"], now)
+                    for m in matches
+                ],
+            )
+
+            unmatched = {BANK: [], GL: []}
+            opened = []
+            for side, rows, keys, offset, matched in (
+                (BANK, new_bank, new_bank_keys, len(old_bank), bank_matched),
+                (GL, new_gl, new_gl_keys, len(old_gl), gl_matched),
+            ):
+                for k, (row, key) in enumerate(zip(rows, keys)):
+                    if matched[offset + k]:
+                        continue
+                    unmatched[side].append(row)
+                    day = amount_cents = None
+                    if key is not None:
+                        day, amount_cents = _day(key[1]), int(key[0] * 100)
+                    opened.append((side, day, amount_cents, _payload(row), now))
+            self._conn.executemany(
+                "INSERT INTO open_items (side, day, amount_cents, payload, added_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                opened,
+            )
+
+        logger.info(
+            f"Reconciled {len(new_bank)} new bank and {len(new_gl)} new GL "
+            f"transactions against {len(old_bank)} + {len(old_gl)} open items: "
+            f"{len(matches)} matched, {len(opened)} added to open items"
+        )
+        return {
+            "matches": matches,
+            "unmatched_bank": unmatched[BANK],
+            "unmatched_gl": unmatched[GL],
+        }
+
+    def open_items(self, side=None) -> list:
+        """All open items (of one side, if given) as stored, oldest first."""
+        sql = "SELECT payload FROM open_items"
+        params = []
+        if side:
+            sql += " WHERE side = ?"
+            params.append(side)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY item_id", params).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def stats(self) -> dict:
+        """Open item counts per side."""
+        with self._lock:
+            counts = dict(
+                self._conn.execute(
+                    "SELECT side, COUNT(*) FROM open_items GROUP BY side"
+                ).fetchall()
+            )
+        return {BANK: counts.get(BANK, 0), GL: counts.get(GL, 0)}
+
+
+def get_open_items_ledger() -> OpenItemsLedger:
+    """Return the process-wide OpenItemsLedger, opening it on first use."""
+    return get_client("open_items_ledger", OpenItemsLedger.from_env)
@@ -1,47 +1,383 @@
 # src/transaction_ai/reconciliation.py
+import bisect
+import datetime
+import functools
+import heapq
+import itertools
+import re
+from collections import deque
+from decimal import Decimal, InvalidOperation
+
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+_DATE_FORMATS = ("%m/%d/%Y", "%d.%m.%Y", "%Y/%m/%d")
+_AMOUNT_NOISE_RE = re.compile(r"[\s,$€£]")
+_CENT = Decimal("0.01")
+# Largest block (rows on either side) given an optimal assignment; bigger
+# ones are assigned greedily.
+OPTIMAL_BLOCK_SIZE = 64
+# Candidate GL keys kept per bank key in tolerance matching, best-scoring
+# first, so dense clusters of near-equal amounts stay near-linear.
+MAX_CANDIDATES = 16
+
 
-def reconcile_transactions(bank_transactions: list, gl_transactions: list) -> dict:
+def normalize_amount(value):
     """
-    Placeholder for reconciliation logic.
-    This function would compare transactions from bank statements (parsed by Document AI)
-    with general ledger entries, identify matches, and flag discrepancies.
-    Gemini could be used here to suggest reasons for mismatches or improve matching logic.
+    Amount as a Decimal rounded to cents, or None. Accepts numbers and
+    strings such as "1,234.50", "$-12.00" or "(12.00)" (negative).
     """
-    logger.info("Reconciliation logic will be implemented here.")
-    # Example: Simple matching by amount and date
-    matches = []
-    unmatched_bank = []
-    unmatched_gl = []
-
-    # In a real scenario, use more sophisticated algorithms (e.g., fuzzy matching,
-    # embedding similarity with Gemini, rule-based systems)
-    # For now, just a basic loop to show intent
-    for bt in bank_transactions:
-        found_match = False
-        for glt in gl_transactions:
-            if bt.get("amount") == glt.get("amount") and bt.get("date") == glt.get(
-                "date"
-            ):
-                matches.append({"bank_tx": bt, "gl_tx": glt})
-                found_match = True
-                break
-        if not found_match:
-            unmatched_bank.append(bt)
-
-    # Add unmatched GL transactions (simplified, in real world needs to handle already matched GLT)
-    for glt in gl_transactions:
-        is_matched = False
-        for match in matches:
-            if glt == match["gl_tx"]:
-                is_matched = True
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, Decimal):
+        amount = value
+    elif isinstance(value, (int, float)):
+        amount = Decimal(str(value))  # str() avoids binary float noise
+    else:
+        text = _AMOUNT_NOISE_RE.sub("", str(value))
+        negative = text.startswith("(") and text.endswith(")")
+        try:
+            amount = Decimal(text.strip("()"))
+        except InvalidOperation:
+            return None
+        if negative:
+            amount = -amount
+    if not amount.is_finite():
+        return None
+    try:
+        return amount.quantize(_CENT)
+    except InvalidOperation:  # too many digits for the context, e.g. 1e30
+        return None
+
+
+def normalize_date(value):
+    """ISO date string (YYYY-MM-DD) of a date, datetime or date string, or None."""
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return _parse_date_text(str(value).strip())
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date_text(text: str):
+    # a statement has few distinct dates; strptime is slow enough to cache
+    try:  # ISO dates and timestamps, e.g. "2024-05-01T09:30:00+00:00"
+        return datetime.datetime.fromisoformat(text).date().isoformat()
+    except ValueError:
+        pass
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+
+def match_key(transaction: dict):
+    """(amount, date) join key of a transaction, or None if either is missing."""
+    amount = normalize_amount(transaction.get("amount"))
+    date = normalize_date(transaction.get("date"))
+    if amount is None or date is None:
+        return None
+    return amount, date
+
+
+def as_rows(transactions) -> list:
+    """
+    Transactions as a list of dicts. Accepts a list of dicts or columnar
+    input: a dict of equal-length column lists ({"amount": [...], ...}).
+    """
+    if isinstance(transactions, dict):
+        columns = list(transactions)
+        return [
+            dict(zip(columns, values))
+            for values in zip(*(transactions[c] for c in columns))
+        ]
+    return list(transactions)
+
+
+def _exact_pairs(bank_keys: list, gl_keys: list) -> list:
+    """Hash join: each bank row to the earliest unused GL row with its key."""
+    open_gl = {}  # key -> deque of GL row positions, in input order
+    for j, key in enumerate(gl_keys):
+        if key is not None:
+            open_gl.setdefault(key, deque()).append(j)
+    pairs = []
+    for i, key in enumerate(bank_keys):
+        candidates = open_gl.get(key)
+        if candidates:
+            pairs.append((i, candidates.popleft(), 1.0))
+    return pairs
+
+
+@functools.lru_cache(maxsize=4096)
+def _day(iso_date: str) -> int:
+    return datetime.date.fromisoformat(iso_date).toordinal()
+
+
+def _open_rows(keys: list, matched) -> dict:
+    """Positions of the unmatched rows with a key, grouped by key in input order."""
+    matched = set(matched)
+    rows = {}
+    for pos, key in enumerate(keys):
+        if key is not None and pos not in matched:
+            rows.setdefault(key, []).append(pos)
+    return rows
+
+
+def _candidate_edges(bank_keys, gl_keys, date_window_days, amount_tolerance):
+    """
+    (bank_index, gl_index, score) for the pairs of distinct keys within the
+    date window and amount tolerance, keeping each bank key's MAX_CANDIDATES
+    best. GL keys are indexed by day, each day's sorted by amount, so a bank
+    key's candidates are found by binary search in the 2 * date_window_days
+    + 1 days around it, walking out from its amount.
+    """
+    by_day = {}  # day -> ([amounts], [gl indexes]) sorted by amount
+    for j, key in enumerate(gl_keys):
+        by_day.setdefault(_day(key[1]), []).append((key[0], j))
+    for day, entries in by_day.items():
+        entries.sort()
+        by_day[day] = ([a for a, _ in entries], [j for _, j in entries])
+
+    tolerance = float(amount_tolerance)
+    edges = []
+    for i, key in enumerate(bank_keys):
+        amount, day = key[0], _day(key[1])
+        low, high = amount - amount_tolerance, amount + amount_tolerance
+        candidates = []
+        for other in range(day - date_window_days, day + date_window_days + 1):
+            index = by_day.get(other)
+            if index is None:
+                continue
+            amounts, positions = index
+            date_term = abs(other - day) / date_window_days if date_window_days else 0
+            start = bisect.bisect_left(amounts, amount)
+            below = range(start - 1, bisect.bisect_left(amounts, low) - 1, -1)
+            above = range(start, bisect.bisect_right(amounts, high))
+            nearest = heapq.merge(
+                ((amount - amounts[k], k) for k in below),
+                ((amounts[k] - amount, k) for k in above),
+            )
+            for difference, k in itertools.islice(nearest, MAX_CANDIDATES):
+                amount_term = float(difference) / tolerance if tolerance else 0
+                score = round(1 - (amount_term + date_term) / 2, 4)
+                candidates.append((-score, positions[k]))
+        candidates.sort()
+        edges.extend((i, j, -score) for score, j in candidates[:MAX_CANDIDATES])
+    return edges
+
+
+def _blocks(edges: list) -> list:
+    """Edges grouped into connected components of the bank/GL graph."""
+    parent = {}
+
+    def find(node):
+        root = node
+        while parent.setdefault(root, root) != root:
+            root = parent[root]
+        while parent[node] != root:  # path compression
+            parent[node], node = root, parent[node]
+        return root
+
+    for i, j, _ in edges:
+        a, b = find(("b", i)), find(("g", j))
+        if a != b:
+            parent[a] = b
+    blocks = {}
+    for edge in edges:
+        blocks.setdefault(find(("b", edge[0])), []).append(edge)
+    return list(blocks.values())
+
+
+def _hungarian(cost: list) -> list:
+    """
+    Minimum-cost assignment of every row of an n x m cost matrix (n <= m)
+    to a distinct column; returns the column of each row. O(n^2 * m).
+    """
+    n, m = len(cost), len(cost[0])
+    inf = float("inf")
+    u, v = [0.0] * (n + 1), [0.0] * (m + 1)
+    p, way = [0] * (m + 1), [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0], j0 = i, 0
+        minv, used = [inf] * (m + 1), [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0, delta, j1 = p[j0], inf, 0
+            row = cost[i0 - 1]
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j], way[j] = cur, j0
+                    if minv[j] < delta:
+                        delta, j1 = minv[j], j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
                 break
-        if not is_matched:
-            unmatched_gl.append(glt)
+        while j0:
+            j1 = way[j0]
+            p[j0], j0 = p[j1], j1
+    assignment = [0] * n
+    for j in range(1, m + 1):
+        if p[j]:
+            assignment[p[j] - 1] = j - 1
+    return assignment
+
+
+def _assign_optimal(block: list) -> list:
+    """
+    Most matches, then the highest total score, within one block.
+    Each match is worth len(block) + score, so no gain in score can pay for
+    a lost match.
+    """
+    banks = sorted({i for i, _, _ in block})
+    gls = sorted({j for _, j, _ in block})
+    transpose = len(banks) > len(gls)
+    rows, cols = (gls, banks) if transpose else (banks, gls)
+    row_pos = {r: k for k, r in enumerate(rows)}
+    col_pos = {c: k for k, c in enumerate(cols)}
+    bonus = len(block) + 1
+    cost = [[0.0] * len(cols) for _ in rows]
+    scores = {}
+    for i, j, score in block:
+        r, c = (j, i) if transpose else (i, j)
+        cost[row_pos[r]][col_pos[c]] = -(bonus + score)
+        scores[(r, c)] = score
+    pairs = []
+    for k, c in enumerate(_hungarian(cost)):
+        r = rows[k]
+        score = scores.get((r, cols[c]))
+        if score is not None:  # rows left over are assigned to non-edges
+            pairs.append((cols[c], r, score) if transpose else (r, cols[c], score))
+    return pairs
+
+
+def _assign_greedy(block: list, bank_rows: list, gl_rows: list) -> list:
+    """
+    Best-scoring key pairs first, each pairing as many of its keys' rows as
+    are left, in input order.
+    """
+    bank_left = {i: deque(bank_rows[i]) for i, _, _ in block}
+    gl_left = {j: deque(gl_rows[j]) for _, j, _ in block}
+    pairs = []
+    for i, j, score in sorted(block, key=lambda e: (-e[2], e[0], e[1])):
+        bank, gl = bank_left[i], gl_left[j]
+        while bank and gl:
+            pairs.append((bank.popleft(), gl.popleft(), score))
+    return pairs
+
 
+def match_pairs(
+    bank_keys: list, gl_keys: list, date_window_days: int = 0, amount_tolerance=0
+) -> list:
+    """
+    (bank_pos, gl_pos, score) matches between two lists of match_key()
+    values (None for rows that cannot match); each position is used at most
+    once. See reconcile_transactions() for the matching rules.
+    """
+    amount_tolerance = normalize_amount(amount_tolerance) or Decimal(0)
+    date_window_days = max(0, int(date_window_days or 0))
+    pairs = _exact_pairs(bank_keys, gl_keys)
+    if not amount_tolerance and not date_window_days:
+        return pairs
+
+    # Tolerance matching runs on the distinct keys of the rows left over;
+    # rows sharing a key are interchangeable.
+    bank_open = _open_rows(bank_keys, (i for i, _, _ in pairs))
+    gl_open = _open_rows(gl_keys, (j for _, j, _ in pairs))
+    bank_rows, gl_rows = list(bank_open.values()), list(gl_open.values())
+    edges = _candidate_edges(
+        list(bank_open), list(gl_open), date_window_days, amount_tolerance
+    )
+    for block in _blocks(edges):
+        n = sum(len(bank_rows[i]) for i in {e[0] for e in block})
+        m = sum(len(gl_rows[j]) for j in {e[1] for e in block})
+        if len(block) == 1 or max(n, m) > OPTIMAL_BLOCK_SIZE:
+            pairs.extend(_assign_greedy(block, bank_rows, gl_rows))
+        else:
+            pairs.extend(
+                _assign_optimal(
+                    [
+                        (p, q, score)
+                        for i, j, score in block
+                        for p in bank_rows[i]
+                        for q in gl_rows[j]
+                    ]
+                )
+            )
+    pairs.sort()
+    return pairs
+
+
+def reconcile_transactions(
+    bank_transactions,
+    gl_transactions,
+    date_window_days: int = 0,
+    amount_tolerance=0,
+) -> dict:
+    """
+    Matches bank statement transactions to general ledger entries, each GL
+    entry being used at most once.
+
+    Amounts are compared as Decimals rounded to cents and dates as ISO dates,
+    so "1,234.50" and 1234.5, or "05/01/2024" and "2024-05-01", match; rows
+    without a usable amount or date are left unmatched.
+
+    By default amount and date must be equal: bank rows are matched in order,
+    each to the earliest unused GL entry with the same key (a hash join,
+    linear in the number of rows). With a `date_window_days` and/or
+    `amount_tolerance`, rows match when their dates are at most that many
+    days apart and their amounts differ by at most that much (e.g. fees,
+    FX rounding). Exact matches are taken first; the rows left over are
+    grouped by key, and each bank key's MAX_CANDIDATES best GL keys are found
+    by binary search over GL keys indexed by day and sorted by amount. Pairs
+    that compete for the same rows form a block; within a block the
+    assignment with the most matches and then the highest total score is
+    chosen (Hungarian algorithm), or a best-score-first greedy one for
+    blocks with more than OPTIMAL_BLOCK_SIZE rows on either side.
+
+    Both transaction arguments may be lists of dicts or dicts of column lists.
+
+    Returns:
+        dict: {"matches": [{"bank_tx", "gl_tx", "score"}], "unmatched_bank":
+        [...], "unmatched_gl": [...]}, in bank / input order. score is 1.0
+        for an exact match, falling linearly to 0.0 at both the date window
+        and the amount tolerance.
+    """
+    bank_rows = as_rows(bank_transactions)
+    gl_rows = as_rows(gl_transactions)
+    pairs = match_pairs(
+        [match_key(r) for r in bank_rows],
+        [match_key(r) for r in gl_rows],
+        date_window_days,
+        amount_tolerance,
+    )
+
+    bank_matched = bytearray(len(bank_rows))
+    gl_matched = bytearray(len(gl_rows))
+    matches = []
+    for i, j, score in pairs:
+        bank_matched[i] = gl_matched[j] = 1
+        matches.append({"bank_tx": bank_rows[i], "gl_tx": gl_rows[j], "score": score})
+    unmatched_bank = [r for i, r in enumerate(bank_rows) if not bank_matched[i]]
+    unmatched_gl = [r for j, r in enumerate(gl_rows) if not gl_matched[j]]
+    logger.info(
+        f"Reconciled {len(bank_rows)} bank and {len(gl_rows)} GL transactions: "
+        f"{len(matches)} matched, {len(unmatched_bank)} bank and "
+        f"{len(unmatched_gl)} GL unmatched"
+    )
     return {
         "matches": matches,
         "unmatched_bank": unmatched_bank,
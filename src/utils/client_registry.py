@@ -0,0 +1,31 @@
+# src/utils/client_registry.py
+import threading
+
+# Process-wide cache of long-lived clients (GCP SDK clients, the pipeline
+# controller, ...). Each entry is created lazily on first use and shared by
+# every caller and thread afterwards.
+_clients = {}
+# Re-entrant so a factory may itself fetch other shared clients.
+_lock = threading.RLock()
+
+
+def get_client(key, factory):
+    """
+    Return the shared client registered under `key`, creating it with
+    `factory()` the first time it is requested.
+    """
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = factory()
+            _clients[key] = client
+        return client
+
+
+def reset_clients():
+    """Drop every cached client (for tests, or after a credentials change)."""
+    with _lock:
+        _clients.clear()
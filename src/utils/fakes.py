@@ -0,0 +1,421 @@
+# src/utils/fakes.py
+"""
+Offline stand-ins for the cloud clients used by the pipeline.
+
+They implement just the subset of the google-cloud client APIs that this
+project calls, so code paths can be exercised locally without credentials,
+network access or API spend.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import shutil
+import threading
+import time
+
+
+class LocalBlob:
+    """Filesystem-backed stand-in for google.cloud.storage.Blob."""
+
+    def __init__(self, bucket, name, chunk_size=None):
+        self.bucket = bucket
+        self.name = name
+        self.chunk_size = chunk_size
+        self.content_type = None
+
+    @property
+    def path(self):
+        return os.path.join(self.bucket.path, *self.name.split("/"))
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path) if self.exists() else None
+
+    def exists(self, client=None):
+        return os.path.isfile(self.path)
+
+    def upload_from_string(self, data, content_type=None):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "wb") as f:
+            f.write(data)
+        self.content_type = content_type
+
+    def upload_from_filename(
+        self, filename, content_type=None, if_generation_match=None
+    ):
+        if if_generation_match == 0 and self.exists():
+            from google.api_core import exceptions
+
+            raise exceptions.PreconditionFailed(f"{self.name} already exists")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        shutil.copyfile(filename, self.path)
+        self.content_type = content_type
+
+    def download_as_bytes(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def download_to_filename(self, filename):
+        shutil.copyfile(self.path, filename)
+
+    def open(self, mode="rb", chunk_size=None, **kwargs):
+        if "w" in mode:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        return open(self.path, mode, **kwargs)
+
+    def delete(self):
+        os.remove(self.path)
+
+
+class LocalBucket:
+    """Filesystem-backed stand-in for google.cloud.storage.Bucket."""
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.path = os.path.join(client.root_dir, name)
+
+    def blob(self, blob_name, chunk_size=None):
+        return LocalBlob(self, blob_name, chunk_size=chunk_size)
+
+    def list_blobs(self, prefix=""):
+        return self.client.list_blobs(self.name, prefix=prefix)
+
+
+class LocalStorageClient:
+    """
+    Stand-in for google.cloud.storage.Client that maps gs://<bucket>/<name>
+    onto <root_dir>/<bucket>/<name>.
+    """
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+
+    def bucket(self, bucket_name):
+        return LocalBucket(self, bucket_name)
+
+    def list_blobs(self, bucket_or_name, prefix=""):
+        bucket = (
+            bucket_or_name
+            if isinstance(bucket_or_name, LocalBucket)
+            else self.bucket(bucket_or_name)
+        )
+        names = []
+        for root, _, files in os.walk(bucket.path):
+            for fname in files:
+                rel = os.path.relpath(os.path.join(root, fname), bucket.path)
+                name = rel.replace(os.sep, "/")
+                if name.startswith(prefix or ""):
+                    names.append(name)
+        return [bucket.blob(name) for name in sorted(names)]
+
+
+class FakeDocumentAIClient:
+    """
+    Stand-in for DocumentProcessorServiceClient.process_document.
+
+    `document_factory(request)` builds the returned Document (an empty one by
+    default); `latency` seconds are slept per call. The peak number of
+    concurrent calls is recorded in `max_in_flight`.
+    """
+
+    def __init__(self, document_factory=None, latency=0.0):
+        self.document_factory = document_factory
+        self.latency = latency
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _enter(self, request):
+        with self._lock:
+            self.requests.append(request)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _response(self, request):
+        from google.cloud import documentai_v1 as documentai
+
+        if self.document_factory is not None:
+            document = self.document_factory(request)
+        else:
+            document = documentai.Document()
+        return documentai.ProcessResponse(document=document)
+
+    def process_document(self, request=None, **kwargs):
+        self._enter(request)
+        try:
+            time.sleep(self.latency)
+            return self._response(request)
+        finally:
+            self._exit()
+
+
+class FakeDocumentAIAsyncClient(FakeDocumentAIClient):
+    """Stand-in for DocumentProcessorServiceAsyncClient.process_document."""
+
+    async def process_document(self, request=None, **kwargs):
+        self._enter(request)
+        try:
+            await asyncio.sleep(self.latency)
+            return self._response(request)
+        finally:
+            self._exit()
+
+
+class FakeOperation:
+    """Stand-in for google.api_core.operation.Operation."""
+
+    def __init__(self, metadata, polls_until_done=1):
+        self.metadata = metadata
+        self._polls_left = polls_until_done
+
+    def done(self):
+        self._polls_left -= 1
+        return self._polls_left < 0
+
+    def result(self, timeout=None):
+        return None
+
+
+class FakeBatchDocumentAIClient(FakeDocumentAIClient):
+    """
+    Stand-in for DocumentProcessorServiceClient.batch_process_documents.
+
+    Reads the input prefix and writes JSON output shards through a
+    LocalStorageClient, laid out like the real service:
+    <output>/<operation-id>/<index>/<name>-<shard>.json.
+    `document_factory(content)` builds the Document for each input file;
+    `shards_per_document` splits its pages across that many shards.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(
+        self,
+        storage_client,
+        document_factory=None,
+        shards_per_document=1,
+        polls_until_done=1,
+    ):
+        super().__init__(document_factory=document_factory)
+        self.storage_client = storage_client
+        self.shards_per_document = shards_per_document
+        self.polls_until_done = polls_until_done
+
+    @staticmethod
+    def _split_uri(gcs_uri):
+        bucket_name, _, prefix = gcs_uri[len("gs://") :].partition("/")
+        return bucket_name, prefix
+
+    def batch_process_documents(self, request=None, **kwargs):
+        from google.cloud import documentai_v1 as documentai
+
+        self.requests.append(request)
+        op_id = next(self._ids)
+        in_bucket, in_prefix = self._split_uri(
+            request.input_documents.gcs_prefix.gcs_uri_prefix
+        )
+        out_bucket, out_prefix = self._split_uri(
+            request.document_output_config.gcs_output_config.gcs_uri
+        )
+        out_prefix = out_prefix.rstrip("/")
+
+        statuses = []
+        blobs = self.storage_client.list_blobs(in_bucket, prefix=in_prefix)
+        for index, blob in enumerate(blobs):
+            if self.document_factory is not None:
+                document = self.document_factory(blob.download_as_bytes())
+            else:
+                document = documentai.Document()
+            stem = os.path.splitext(os.path.basename(blob.name))[0]
+            dest = f"{out_prefix}/{op_id}/{index}"
+            pages = list(document.pages)
+            n = max(1, self.shards_per_document)
+            for shard_index in range(n):
+                shard = documentai.Document(document)
+                if len(pages) > 1:
+                    shard.pages = pages[shard_index::n]
+                if shard_index:
+                    # entities are reported once, not repeated per shard
+                    del shard.entities[:]
+                shard.shard_info = documentai.Document.ShardInfo(
+                    shard_index=shard_index, shard_count=n
+                )
+                out_blob = self.storage_client.bucket(out_bucket).blob(
+                    f"{dest}/{stem}-{shard_index}.json"
+                )
+                out_blob.upload_from_string(
+                    documentai.Document.to_json(shard),
+                    content_type="application/json",
+                )
+            statuses.append(
+                documentai.BatchProcessMetadata.IndividualProcessStatus(
+                    input_gcs_source=f"gs://{in_bucket}/{blob.name}",
+                    output_gcs_destination=f"gs://{out_bucket}/{dest}",
+                )
+            )
+
+        metadata = documentai.BatchProcessMetadata(
+            state=documentai.BatchProcessMetadata.State.SUCCEEDED,
+            individual_process_statuses=statuses,
+        )
+        return FakeOperation(metadata, polls_until_done=self.polls_until_done)
+
+
+class FakeLoadJob:
+    """Stand-in for google.cloud.bigquery.LoadJob."""
+
+    def __init__(self, output_rows):
+        self.output_rows = output_rows
+        self.errors = None
+
+    def result(self, timeout=None):
+        return self
+
+
+class FakeBigQueryClient:
+    """
+    In-memory stand-in for google.cloud.bigquery.Client.
+
+    Tables live in `tables` (path -> list of rows). insert_rows_json honours
+    row_ids with the same best-effort dedup window as the real API, and every
+    request is recorded in `insert_calls` / `load_calls`. `errors` injects
+    failures into insert and load requests, one entry per request as in
+    FakeGeminiModel.
+    """
+
+    def __init__(self, project="fake-project", errors=None):
+        self.project = project
+        self.errors = list(errors or [])
+        self.tables = {}
+        self.schemas = {}
+        self.insert_calls = []
+        self.load_calls = []
+        self.get_table_calls = 0
+        self._seen_row_ids = {}
+        self._lock = threading.Lock()
+
+    def dataset(self, dataset_id):
+        from google.cloud import bigquery
+
+        return bigquery.DatasetReference(self.project, dataset_id)
+
+    def get_table(self, table_ref):
+        self.get_table_calls += 1
+        if str(table_ref) not in self.tables:
+            raise LookupError(f"Not found: Table {table_ref}")
+        return table_ref
+
+    def create_table(self, table):
+        key = str(table.reference)
+        with self._lock:
+            self.tables.setdefault(key, [])
+            self.schemas[key] = table.schema
+        return table
+
+    def _maybe_fail(self):
+        with self._lock:
+            error = self.errors.pop(0) if self.errors else None
+        if error is not None:
+            raise error
+
+    def insert_rows_json(self, table_ref, json_rows, row_ids=None, **kwargs):
+        self._maybe_fail()
+        key = str(table_ref)
+        with self._lock:
+            self.insert_calls.append(
+                {"table": key, "rows": len(json_rows), "row_ids": row_ids}
+            )
+            rows = self.tables.setdefault(key, [])
+            seen = self._seen_row_ids.setdefault(key, set())
+            for i, row in enumerate(json_rows):
+                row_id = row_ids[i] if row_ids else None
+                if row_id is not None:
+                    if row_id in seen:
+                        continue
+                    seen.add(row_id)
+                rows.append(dict(row))
+        return []
+
+    def load_table_from_file(self, file_obj, destination, job_config=None, **kwargs):
+        import json
+
+        self._maybe_fail()
+        key = str(destination)
+        data = file_obj.read().decode("utf-8")
+        loaded = [json.loads(line) for line in data.splitlines() if line.strip()]
+        with self._lock:
+            self.load_calls.append({"table": key, "rows": len(loaded)})
+            self.tables.setdefault(key, []).extend(loaded)
+        return FakeLoadJob(len(loaded))
+
+
+class FakeTextResponse:
+    """Stand-in for vertexai TextGenerationResponse."""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """
+    Stand-in for vertexai TextGenerationModel.predict.
+
+    `classify(description)` picks the category for one transaction ("Other"
+    by default). Single-transaction prompts get the bare category back;
+    batched prompts (a JSON array of {"id", "description"} on its own line)
+    get a JSON array of {"id", "category"}. Prompts are recorded in
+    `prompts`; `latency` seconds are slept per call. `errors` injects
+    failures: one entry per call, in call order, each an exception to raise
+    or None to answer normally (e.g. [ResourceExhausted("quota"), None]).
+    The peak number of concurrent calls is recorded in `max_in_flight`.
+    """
+
+    def __init__(self, classify=None, latency=0.0, errors=None):
+        self.classify = classify or (lambda description: "Other")
+        self.latency = latency
+        self.errors = list(errors or [])
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def predict(self, prompt, **kwargs):
+        with self._lock:
+            self.prompts.append(prompt)
+            error = self.errors.pop(0) if self.errors else None
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            if error is not None:
+                raise error
+            return self._answer(prompt)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _answer(self, prompt):
+        for line in prompt.splitlines():
+            if line.startswith("[{"):
+                items = json.loads(line)
+                return FakeTextResponse(
+                    json.dumps(
+                        [
+                            {"id": i["id"], "category": self.classify(i["description"])}
+                            for i in items
+                        ]
+                    )
+                )
+        description = prompt.split('Transaction Description: "', 1)[1]
+        description = description.rsplit('"', 1)[0]
+        return FakeTextResponse(self.classify(description))
@@ -1,41 +1,64 @@
 # src/utils/gcp_auth.py
-
-from google.api_core.client_options import ClientOptions
-from google.cloud import aiplatform, bigquery
-from google.cloud import documentai_v1beta3 as documentai
-from google.cloud import storage
+import threading
 
 from config.settings import (  # <--- Ensure GCP_REGION is imported
     GCP_PROJECT_ID,
     GCP_REGION,
 )
+from src.utils.client_registry import get_client
 from src.utils.logger import get_logger
 
+# The Google Cloud SDKs are imported inside each getter: importing all of them
+# up front costs seconds of cold start, and most entry points need only one.
+
 logger = get_logger(__name__)
 
+_vertex_ai_initialized = False
+_vertex_ai_lock = threading.Lock()
+
+
+# All getters below return one client per process, created on first use and
+# shared across threads; see src.utils.client_registry.reset_clients().
+
 
 def get_storage_client():
+    from google.cloud import storage
+
     try:
-        return storage.Client(project=GCP_PROJECT_ID)
+        return get_client(
+            ("storage", GCP_PROJECT_ID),
+            lambda: storage.Client(project=GCP_PROJECT_ID),
+        )
     except Exception as e:
         logger.error(f"Error getting Cloud Storage client: {e}")
         raise
 
 
 def get_bigquery_client():
+    from google.cloud import bigquery
+
     try:
-        return bigquery.Client(project=GCP_PROJECT_ID)
+        return get_client(
+            ("bigquery", GCP_PROJECT_ID),
+            lambda: bigquery.Client(project=GCP_PROJECT_ID),
+        )
     except Exception as e:
         logger.error(f"Error getting BigQuery client: {e}")
         raise
 
 
 def get_document_ai_client():
+    from google.api_core.client_options import ClientOptions
+    from google.cloud import documentai_v1beta3 as documentai
+
     try:
-        return documentai.DocumentProcessorServiceClient(
-            client_options=ClientOptions(
-                api_endpoint=f"{GCP_REGION}-documentai.googleapis.com"
-            )
+        return get_client(
+            ("documentai_v1beta3", GCP_REGION),
+            lambda: documentai.DocumentProcessorServiceClient(
+                client_options=ClientOptions(
+                    api_endpoint=f"{GCP_REGION}-documentai.googleapis.com"
+                )
+            ),
         )
     except Exception as e:
         logger.error(f"Error getting Document AI client: {e}")
@@ -44,9 +67,16 @@ def get_document_ai_client():
 
 def get_aiplatform_endpoint_client():
     """Client for calling deployed Vertex AI Endpoints."""
+    from google.cloud import aiplatform
+
     try:
-        return aiplatform.gapic.PredictionServiceClient(
-            client_options={"api_endpoint": f"{GCP_REGION}-aiplatform.googleapis.com"}
+        return get_client(
+            ("aiplatform_prediction", GCP_REGION),
+            lambda: aiplatform.gapic.PredictionServiceClient(
+                client_options={
+                    "api_endpoint": f"{GCP_REGION}-aiplatform.googleapis.com"
+                }
+            ),
         )
     except Exception as e:
         logger.error(f"Error getting Vertex AI Prediction Service client: {e}")
@@ -55,43 +85,44 @@ def get_aiplatform_endpoint_client():
 
 def get_aiplatform_model_client():
     """Client for managing Vertex AI Models (e.g., deploying)."""
-    try:
-        return aiplatform.gapic.ModelServiceClient(
-            client_options={"api_endpoint": f"{GCP_REGION}-aiplatform.googleapis.com"}
-        )
-    except Exception as e:
-        logger.error(f"Error getting Vertex AI Model Service client: {e}")
-        raise
+    from google.cloud import aiplatform
 
-
-# Initialize Vertex AI SDK
-def init_vertex_ai_sdk():
     try:
-        aiplatform.init(project=GCP_PROJECT_ID, location=GCP_REGION)
-        logger.info(
-            f"Vertex AI SDK initialized for project '{GCP_PROJECT_ID}' in region '{GCP_REGION}'"
+        return get_client(
+            ("aiplatform_model", GCP_REGION),
+            lambda: aiplatform.gapic.ModelServiceClient(
+                client_options={
+                    "api_endpoint": f"{GCP_REGION}-aiplatform.googleapis.com"
+                }
+            ),
         )
     except Exception as e:
-        logger.error(f"Error initializing Vertex AI SDK: {e}")
+        logger.error(f"Error getting Vertex AI Model Service client: {e}")
         raise
 
 
 # Initialize Vertex AI SDK
 def init_vertex_ai_sdk():
-    try:
-        # --- ADD THESE DEBUG PRINTS ---
-        logger.info(
-            f"DEBUG: Attempting to initialize Vertex AI with Project ID: '{GCP_PROJECT_ID}'"
-        )
-        logger.info(
-            f"DEBUG: Attempting to initialize Vertex AI with Region: '{GCP_REGION}'"
-        )
-        # --- END DEBUG PRINTS ---
-
-        aiplatform.init(project=GCP_PROJECT_ID, location=GCP_REGION)
-        logger.info(
-            f"Vertex AI SDK initialized for project '{GCP_PROJECT_ID}' in region '{GCP_REGION}'"
-        )
-    except Exception as e:
-        logger.error(f"Error initializing Vertex AI SDK: {e}")
-        raise
+    """Initialise the Vertex AI SDK once per process; later calls are no-ops."""
+    global _vertex_ai_initialized
+    if _vertex_ai_initialized:
+        return
+    with _vertex_ai_lock:
+        if _vertex_ai_initialized:
+            return
+        from google.cloud import aiplatform
+
+        try:
+            logger.debug(
+                f"Initializing Vertex AI with Project ID '{GCP_PROJECT_ID}' "
+                f"and Region '{GCP_REGION}'"
+            )
+            aiplatform.init(project=GCP_PROJECT_ID, location=GCP_REGION)
+            logger.info(
+                f"Vertex AI SDK initialized for project '{GCP_PROJECT_ID}' "
+                f"in region '{GCP_REGION}'"
+            )
+        except Exception as e:
+            logger.error(f"Error initializing Vertex AI SDK: {e}")
+            raise
+        _vertex_ai_initialized = True
@@ -0,0 +1,60 @@
+# src/utils/local_state.py
+"""
+Where local state (SQLite stores, caches, output files) lives, and the
+SQLite boilerplate shared by the stores that keep it.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+
+
+def default_state_path(env_var: str, default_path: str) -> str:
+    """
+    Path of a piece of local state: the value of `env_var` when set;
+    otherwise, when K_SERVICE is set (Cloud Functions / Cloud Run, where only
+    /tmp is writable), the default's basename under the temp directory;
+    otherwise `default_path`.
+    """
+    path = os.getenv(env_var)
+    if path:
+        return path
+    if os.getenv("K_SERVICE"):
+        return os.path.join(tempfile.gettempdir(), os.path.basename(default_path))
+    return default_path
+
+
+def output_dir() -> str:
+    """
+    Root of the output files (detail CSVs, summary lists, Parquet dataset):
+    OUTPUT_DIR, else data/output (the temp directory's output/ on K_SERVICE).
+    """
+    return default_state_path("OUTPUT_DIR", os.path.join("data", "output"))
+
+
+class SQLiteStore:
+    """
+    Base of the local SQLite stores. Opens `path` (creating its directory)
+    with one connection shared between threads, serialised by `_lock`, and
+    applies the class's SCHEMA script. With WAL set, readers (e.g. a query
+    CLI) are not blocked while a run writes.
+    """
+
+    SCHEMA = ""
+    WAL = False
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        if self.WAL:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.executescript(self.SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()